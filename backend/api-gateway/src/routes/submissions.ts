@@ -31,9 +31,16 @@ router.post(
     const { problemId, language, code, sessionId } = req.body as CreateSubmissionRequest;
     const submissionId = uuidv4();
 
-    // Verify problem exists
-    const problems = await query<{ id: string }>(
-      'SELECT id FROM problems WHERE id = $1',
+    // Verify problem exists and has tests; workers load the tests themselves
+    const problems = await query<{
+      id: string;
+      timeLimit: number;
+      testSetVersion: number;
+      hasTestCases: boolean;
+    }>(
+      `SELECT p.id, p.time_limit as "timeLimit", p.test_set_version as "testSetVersion",
+              EXISTS (SELECT 1 FROM test_cases WHERE problem_id = p.id) as "hasTestCases"
+       FROM problems p WHERE p.id = $1`,
       [problemId]
     );
 
@@ -41,13 +48,7 @@ router.post(
       throw new NotFoundError('Problem');
     }
 
-    // Get test cases for the problem
-    const testCases = await query<{ id: string; input: string; expectedOutput: string }>(
-      'SELECT id, input, expected_output as "expectedOutput" FROM test_cases WHERE problem_id = $1 ORDER BY order_index',
-      [problemId]
-    );
-
-    if (testCases.length === 0) {
+    if (!problems[0]!.hasTestCases) {
       throw new BadRequestError('Problem has no test cases');
     }
 
@@ -64,11 +65,9 @@ router.post(
       problemId,
       language,
       code,
-      testCases: testCases.map((tc) => ({
-        id: tc.id,
-        input: tc.input,
-        expectedOutput: tc.expectedOutput,
-      })),
+      timeLimit: problems[0]!.timeLimit,
+      sessionId,
+      testSetVersion: problems[0]!.testSetVersion,
     });
 
     logger.info({ submissionId, problemId, language }, 'Submission created');
@@ -25,36 +25,79 @@ connection.on('connect', () => {
   logger.info('Redis connected');
 });
 
-export const executionQueue = new Queue<ExecutionJob>('execution-queue', {
-  connection,
-  defaultJobOptions: {
-    attempts: 3,
-    backoff: {
-      type: 'exponential',
-      delay: 1000,
-    },
-    removeOnComplete: {
-      count: 1000,
-      age: 3600, // 1 hour
-    },
-    removeOnFail: {
-      count: 500,
-      age: 86400, // 24 hours
+const QUEUE_NAME = 'execution-queue';
+
+// Language-affinity sharding: QUEUE_SHARDS ("java=jvm,cpp=native") routes a
+// language to its own queue (execution-queue-<shard>) so workers that own the
+// shard keep its runtimes warm. Unlisted languages use the default queue.
+// Workers read the same variable and must agree with it.
+const parseShardMap = (spec: string): Map<string, string> => {
+  const shards = new Map<string, string>();
+  for (const entry of spec.split(',')) {
+    const [language, shard] = entry.split('=').map((part) => part.trim().toLowerCase());
+    if (language && shard) {
+      shards.set(language, shard);
+    }
+  }
+  return shards;
+};
+
+const shardMap = parseShardMap(process.env['QUEUE_SHARDS'] ?? '');
+
+const shardQueueName = (shard: string): string =>
+  shard === 'default' ? QUEUE_NAME : `${QUEUE_NAME}-${shard}`;
+
+const createQueue = (name: string): Queue<ExecutionJob> => {
+  const queue = new Queue<ExecutionJob>(name, {
+    connection,
+    defaultJobOptions: {
+      attempts: 3,
+      backoff: {
+        type: 'exponential',
+        delay: 1000,
+      },
+      removeOnComplete: {
+        count: 1000,
+        age: 3600, // 1 hour
+      },
+      removeOnFail: {
+        count: 500,
+        age: 86400, // 24 hours
+      },
     },
-  },
-});
+  });
 
-executionQueue.on('error', (err) => {
-  // Log but don't crash - queue errors are often recoverable
-  logger.error({ err: err.message }, 'Queue error (non-fatal)');
-});
+  queue.on('error', (err) => {
+    // Log but don't crash - queue errors are often recoverable
+    logger.error({ err: err.message, queue: name }, 'Queue error (non-fatal)');
+  });
+
+  return queue;
+};
+
+export const executionQueue = createQueue(QUEUE_NAME);
+
+// One queue per shard, the default queue included
+const queues = new Map<string, Queue<ExecutionJob>>([['default', executionQueue]]);
+for (const shard of shardMap.values()) {
+  if (!queues.has(shard)) {
+    queues.set(shard, createQueue(shardQueueName(shard)));
+  }
+}
+
+const queueForLanguage = (language: string): Queue<ExecutionJob> =>
+  queues.get(shardMap.get(language) ?? 'default') ?? executionQueue;
 
 export const addExecutionJob = async (job: ExecutionJob): Promise<string> => {
-  const result = await executionQueue.add('execute', job, {
+  const queue = queueForLanguage(job.language);
+  const result = await queue.add('execute', job, {
     jobId: job.submissionId,
     priority: 1,
   });
-  logger.info({ submissionId: job.submissionId, jobId: result.id }, 'Job added to queue');
+  logger.info(
+    { submissionId: job.submissionId, jobId: result.id, queue: queue.name },
+    'Job added to queue'
+  );
   return result.id ?? job.submissionId;
 };
 
@@ -64,17 +107,29 @@ export const getQueueStats = async (): Promise<{
   completed: number;
   failed: number;
 }> => {
-  const [waiting, active, completed, failed] = await Promise.all([
-    executionQueue.getWaitingCount(),
-    executionQueue.getActiveCount(),
-    executionQueue.getCompletedCount(),
-    executionQueue.getFailedCount(),
-  ]);
-  return { waiting, active, completed, failed };
+  const perQueue = await Promise.all(
+    [...queues.values()].map(async (queue) => {
+      const [waiting, active, completed, failed, fairPending] = await Promise.all([
+        queue.getWaitingCount(),
+        queue.getActiveCount(),
+        queue.getCompletedCount(),
+        queue.getFailedCount(),
+        // Jobs the workers' fair-share scheduler has taken out of BullMQ's
+        // prioritized set but not yet started
+        connection.get(`bull:${queue.name}:fair:pending`),
+      ]);
+      return [waiting + Number(fairPending ?? 0), active, completed, failed];
+    })
+  );
+  const [waiting, active, completed, failed] = perQueue.reduce(
+    (totals, counts) => totals.map((total, i) => total + counts[i]!),
+    [0, 0, 0, 0]
+  );
+  return { waiting: waiting!, active: active!, completed: completed!, failed: failed! };
 };
 
 export const closeQueue = async (): Promise<void> => {
-  await executionQueue.close();
+  await Promise.all([...queues.values()].map((queue) => queue.close()));
   await connection.quit();
   logger.info('Queue connection closed');
 };
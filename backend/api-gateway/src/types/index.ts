@@ -46,6 +46,7 @@ export type DbSubmissionStatus =
   | 'wrong_answer'
   | 'time_limit_exceeded'
   | 'memory_limit_exceeded'
+  | 'output_limit_exceeded'
   | 'runtime_error'
   | 'compilation_error'
   | 'system_error';
@@ -57,6 +58,7 @@ export type SubmissionStatus =
   | 'Accepted'
   | 'Wrong Answer'
   | 'Time Limit Exceeded'
+  | 'Output Limit Exceeded'
   | 'Runtime Error'
   | 'Compilation Error';
 
@@ -69,6 +71,7 @@ export const dbToApiStatus = (dbStatus: string): SubmissionStatus => {
     'wrong_answer': 'Wrong Answer',
     'time_limit_exceeded': 'Time Limit Exceeded',
     'memory_limit_exceeded': 'Time Limit Exceeded',
+    'output_limit_exceeded': 'Output Limit Exceeded',
     'runtime_error': 'Runtime Error',
     'compilation_error': 'Compilation Error',
     'system_error': 'Runtime Error',
@@ -164,11 +167,9 @@ export interface ExecutionJob {
   problemId: string;
   language: SupportedLanguage;
   code: string;
-  testCases: Array<{
-    id: string;
-    input: string;
-    expectedOutput: string;
-  }>;
+  timeLimit?: number; // seconds of CPU time per test case
+  sessionId?: string; // fair-share key for the workers' scheduler
+  testSetVersion: number; // workers load the problem's tests at least this new
 }
 
 export interface ExecutionResult {
@@ -0,0 +1,78 @@
+#!/bin/sh
+# Batch harness: run a program against every test input in one exec.
+#
+# Usage: codearena-batch <cpu-seconds> <output-limit-bytes> <test-dir> -- <command...>
+#
+# Runs <command> once per <test-dir>/<n>.in (n = 0, 1, ...) with that file on
+# stdin and its own CPU rlimit. Each result is written to stdout as a JSON
+# header line followed by the test's stdout and stderr bytes:
+#
+#   {"test":0,"exit":0,"cpu_us":1234,"peak_bytes":5678,"stdout":3,"stderr":0}
+#
+# Each stream is cut at limit + 1 bytes, and the program is stopped by
+# SIGPIPE once it goes past that, so the caller can tell it overflowed. The
+# batch ends early after a test hits its CPU or output limit, since that
+# ends judging anyway.
+
+cpu_limit=$1
+out_limit=$2
+dir=$3
+shift 4
+
+cg_cpu() {
+  cpu=-1
+  if [ -r /sys/fs/cgroup/cpu.stat ]; then
+    cpu=0
+    while read -r k v; do
+      case $k in user_usec|system_usec) cpu=$((cpu + v));; esac
+    done < /sys/fs/cgroup/cpu.stat
+  elif [ -r /sys/fs/cgroup/cpuacct/cpuacct.usage ]; then
+    read -r ns < /sys/fs/cgroup/cpuacct/cpuacct.usage
+    cpu=$((ns / 1000))
+  fi
+}
+
+cg_peak() {
+  peak=-1
+  for f in /sys/fs/cgroup/memory.peak /sys/fs/cgroup/memory/memory.max_usage_in_bytes; do
+    if [ -r $f ]; then read -r peak < $f; return; fi
+  done
+}
+
+mkfifo "$dir/.stdout" "$dir/.stderr" || exit 1
+
+n=0
+while [ -f "$dir/$n.in" ]; do
+  head -c $((out_limit + 1)) < "$dir/.stdout" > "$dir/$n.out" &
+  out_reader=$!
+  head -c $((out_limit + 1)) < "$dir/.stderr" > "$dir/$n.err" &
+  err_reader=$!
+
+  cg_cpu; cpu0=$cpu
+  ( ulimit -S -t "$cpu_limit" && ulimit -H -t $((cpu_limit + 1)) && exec "$@" ) \
+    < "$dir/$n.in" > "$dir/.stdout" 2> "$dir/.stderr"
+  rc=$?
+  cg_cpu; cg_peak
+  wait $out_reader $err_reader
+  # Nothing the test left running may reach the next one; kill -1 spares
+  # this shell and PID 1
+  kill -9 -1 2>/dev/null
+
+  out_size=$(($(wc -c < "$dir/$n.out")))
+  err_size=$(($(wc -c < "$dir/$n.err")))
+  cpu_us=-1
+  [ "$cpu0" -ge 0 ] && cpu_us=$((cpu - cpu0))
+
+  printf '{"test":%d,"exit":%d,"cpu_us":%d,"peak_bytes":%d,"stdout":%d,"stderr":%d}\n' \
+    "$n" "$rc" "$cpu_us" "$peak" "$out_size" "$err_size"
+  cat "$dir/$n.out" "$dir/$n.err"
+  rm -f "$dir/$n.in" "$dir/$n.out" "$dir/$n.err"
+
+  # 152 = 128 + SIGXCPU
+  if [ "$rc" -eq 152 ] || [ "$out_size" -gt "$out_limit" ] || [ "$err_size" -gt "$out_limit" ]; then
+    break
+  fi
+  n=$((n + 1))
+done
+
+rm -f "$dir/.stdout" "$dir/.stderr"
@@ -0,0 +1,233 @@
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.BufferedOutputStream;
+import java.io.FileDescriptor;
+import java.io.FileOutputStream;
+import java.io.IOException;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.management.ManagementFactory;
+import java.lang.management.MemoryPoolMXBean;
+import java.lang.management.MemoryType;
+import java.lang.management.ThreadMXBean;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.security.Permission;
+
+/**
+ * Batch harness for Java: runs the compiled solution against every test
+ * input in one JVM, so JVM startup is paid once per submission instead of
+ * once per test case.
+ *
+ * Usage: java -Djava.security.manager=allow -cp /opt/codearena BatchRunner
+ *            cpu-seconds output-limit-bytes test-dir classpath main-class
+ *
+ * The output protocol matches codearena-batch: per test, a JSON header line
+ * followed by the test's stdout and stderr bytes. Each test loads the
+ * solution in a fresh class loader, so static state never leaks between
+ * tests, and System.exit is trapped so it only ends the current test.
+ */
+public final class BatchRunner {
+
+    /** 128 + SIGXCPU, the status a CPU-limited process exits with. */
+    private static final int CPU_LIMIT_EXIT = 152;
+
+    private static final ThreadMXBean THREADS = ManagementFactory.getThreadMXBean();
+
+    private static Thread harness;
+
+    /** Thrown in place of System.exit from solution code. */
+    private static final class ExitTrap extends SecurityException {
+        private static final long serialVersionUID = 1L;
+        final int status;
+
+        ExitTrap(int status) {
+            super("System.exit(" + status + ")");
+            this.status = status;
+        }
+    }
+
+    /** Keeps at most limit + 1 bytes, so overflow is visible to the caller. */
+    private static final class LimitedOutput extends ByteArrayOutputStream {
+        private final int limit;
+        private volatile boolean overflowed;
+
+        LimitedOutput(int limit) {
+            this.limit = limit;
+        }
+
+        @Override
+        public synchronized void write(int b) {
+            write(new byte[] {(byte) b}, 0, 1);
+        }
+
+        @Override
+        public synchronized void write(byte[] b, int off, int len) {
+            int room = limit + 1 - count;
+            if (room > 0) {
+                super.write(b, off, Math.min(len, room));
+            }
+            if (count > limit) {
+                overflowed = true;
+            }
+        }
+
+        boolean overflowed() {
+            return overflowed;
+        }
+    }
+
+    /** Outcome of one test, filled in by the solution thread. */
+    private static final class Run {
+        volatile int exit;
+        volatile long cpuNanos = -1;
+    }
+
+    public static void main(String[] args) throws Exception {
+        long cpuLimitNanos = Long.parseLong(args[0]) * 1_000_000_000L;
+        int outputLimit = Integer.parseInt(args[1]);
+        Path dir = Paths.get(args[2]);
+        URL[] classpath = {Paths.get(args[3]).toUri().toURL()};
+        String mainClass = args[4];
+
+        OutputStream results = new BufferedOutputStream(new FileOutputStream(FileDescriptor.out));
+        harness = Thread.currentThread();
+        System.setSecurityManager(new SecurityManager() {
+            @Override
+            public void checkExit(int status) {
+                if (Thread.currentThread() != harness) {
+                    throw new ExitTrap(status);
+                }
+            }
+
+            @Override
+            public void checkPermission(Permission perm) {
+            }
+
+            @Override
+            public void checkPermission(Permission perm, Object context) {
+            }
+        });
+
+        for (int n = 0; Files.exists(dir.resolve(n + ".in")); n++) {
+            LimitedOutput out = new LimitedOutput(outputLimit);
+            LimitedOutput err = new LimitedOutput(outputLimit);
+            System.setIn(new ByteArrayInputStream(Files.readAllBytes(dir.resolve(n + ".in"))));
+            System.setOut(new PrintStream(out, false));
+            System.setErr(new PrintStream(err, true));
+            resetHeapPeak();
+
+            Run run = new Run();
+            URLClassLoader loader = new URLClassLoader(classpath, BatchRunner.class.getClassLoader());
+            Thread solution = new Thread(() -> runSolution(loader, mainClass, run), "main");
+            long start = System.nanoTime();
+            solution.start();
+
+            boolean stop = false;
+            while (solution.isAlive()) {
+                solution.join(10);
+                long cpu = THREADS.getThreadCpuTime(solution.getId());
+                if (cpu > cpuLimitNanos) {
+                    run.cpuNanos = cpu;
+                    run.exit = CPU_LIMIT_EXIT;
+                    stop = true;
+                    break;
+                }
+                if (out.overflowed() || err.overflowed()) {
+                    run.cpuNanos = cpu;
+                    run.exit = 1;
+                    stop = true;
+                    break;
+                }
+            }
+            long wallNanos = System.nanoTime() - start;
+            System.out.flush();
+            System.err.flush();
+
+            writeResult(results, n, run, heapPeak(), wallNanos, out, err);
+            killStrayProcesses();
+            loader.close();
+            if (stop || out.overflowed() || err.overflowed()) {
+                // The solution thread can't be stopped safely; end the batch
+                break;
+            }
+        }
+
+        results.flush();
+        Runtime.getRuntime().halt(0);
+    }
+
+    /** Kill processes a test started, so none of them reach the next test. */
+    private static void killStrayProcesses() {
+        long self = ProcessHandle.current().pid();
+        ProcessHandle.allProcesses()
+            .filter(p -> p.pid() != 1 && p.pid() != self)
+            .forEach(ProcessHandle::destroyForcibly);
+    }
+
+    private static void runSolution(URLClassLoader loader, String mainClass, Run run) {
+        try {
+            Method main = loader.loadClass(mainClass).getMethod("main", String[].class);
+            main.invoke(null, (Object) new String[0]);
+            System.out.flush();
+            run.exit = 0;
+        } catch (Throwable t) {
+            System.out.flush();
+            Throwable cause = t instanceof InvocationTargetException ? t.getCause() : t;
+            run.exit = exitStatus(cause);
+        } finally {
+            run.cpuNanos = THREADS.getCurrentThreadCpuTime();
+        }
+    }
+
+    private static int exitStatus(Throwable t) {
+        for (Throwable c = t; c != null; c = c.getCause()) {
+            if (c instanceof ExitTrap) {
+                return ((ExitTrap) c).status;
+            }
+        }
+        // Same report the java launcher prints for an uncaught exception
+        System.err.print("Exception in thread \"main\" ");
+        t.printStackTrace();
+        return 1;
+    }
+
+    private static void resetHeapPeak() {
+        System.gc();
+        for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+            if (pool.getType() == MemoryType.HEAP) {
+                pool.resetPeakUsage();
+            }
+        }
+    }
+
+    private static long heapPeak() {
+        long peak = 0;
+        for (MemoryPoolMXBean pool : ManagementFactory.getMemoryPoolMXBeans()) {
+            if (pool.getType() == MemoryType.HEAP) {
+                peak += pool.getPeakUsage().getUsed();
+            }
+        }
+        return peak;
+    }
+
+    private static void writeResult(OutputStream results, int test, Run run, long peakBytes,
+                                    long wallNanos, LimitedOutput out, LimitedOutput err)
+            throws IOException {
+        String header = String.format(
+            "{\"test\":%d,\"exit\":%d,\"cpu_us\":%d,\"peak_bytes\":%d,\"wall_us\":%d,"
+                + "\"stdout\":%d,\"stderr\":%d}\n",
+            test, run.exit, run.cpuNanos < 0 ? -1 : run.cpuNanos / 1000, peakBytes,
+            wallNanos / 1000, out.size(), err.size());
+        results.write(header.getBytes(StandardCharsets.UTF_8));
+        out.writeTo(results);
+        err.writeTo(results);
+        results.flush();
+    }
+}
@@ -0,0 +1,59 @@
+import java.io.BufferedReader;
+import java.io.InputStreamReader;
+import java.io.PrintWriter;
+import java.util.ArrayDeque;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Collections;
+import java.util.HashMap;
+import java.util.HashSet;
+import java.util.List;
+import java.util.Map;
+import java.util.PriorityQueue;
+import java.util.Scanner;
+import java.util.Set;
+import java.util.StringTokenizer;
+import java.util.TreeMap;
+import java.util.stream.Collectors;
+import java.util.stream.IntStream;
+
+/**
+ * Stand-in submission used only while building the runner image. Compiling
+ * and running it records the JDK classes a typical solution loads, which
+ * the Dockerfile turns into the class-data sharing archives for javac and
+ * the runtime.
+ */
+public class Warmup {
+    public static void main(String[] args) throws Exception {
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in));
+        StringTokenizer tokens = new StringTokenizer(in.readLine());
+        int n = Integer.parseInt(tokens.nextToken());
+
+        List<Integer> values = new ArrayList<>();
+        Map<Integer, Integer> counts = new HashMap<>();
+        Set<Long> seen = new HashSet<>();
+        TreeMap<String, Integer> ordered = new TreeMap<>();
+        PriorityQueue<int[]> heap = new PriorityQueue<>((a, b) -> Integer.compare(a[0], b[0]));
+        ArrayDeque<Integer> queue = new ArrayDeque<>();
+        for (int i = 0; i < n; i++) {
+            values.add(i);
+            counts.merge(i % 3, 1, Integer::sum);
+            seen.add((long) i * i);
+            ordered.put(String.valueOf(i), i);
+            heap.add(new int[] {n - i, i});
+            queue.add(i);
+        }
+        Collections.sort(values, Collections.reverseOrder());
+        long[] sorted = IntStream.range(0, n).mapToLong(i -> (long) i * 7 % 5).sorted().toArray();
+
+        StringBuilder out = new StringBuilder();
+        out.append(values.stream().map(String::valueOf).collect(Collectors.joining(" ")));
+        out.append('\n').append(Arrays.toString(sorted)).append(' ').append(counts).append('\n');
+        out.append(String.format("%.3f %d%n", Math.sqrt(n), seen.size() + heap.size() + queue.size()));
+
+        PrintWriter writer = new PrintWriter(System.out);
+        writer.print(out);
+        writer.println(new Scanner("1 2").nextInt() + ordered.firstKey());
+        writer.flush();
+    }
+}
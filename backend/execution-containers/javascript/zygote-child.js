@@ -0,0 +1,38 @@
+'use strict';
+
+// Standby child for the JavaScript zygote (see zygote.js). Boots Node and
+// loads the modules solutions commonly use, then waits for the zygote to
+// name the script to run. Its stdin already carries the test input.
+
+const fs = require('fs');
+const Module = require('module');
+
+for (const name of ['assert', 'buffer', 'events', 'os', 'path', 'readline', 'string_decoder', 'util']) {
+  require(name);
+}
+
+// File descriptor the zygote reads CPU time and peak RSS from
+const USAGE_FD = 4;
+
+process.once('message', ({ script }) => {
+  // Drop the IPC channel so it doesn't keep the event loop alive
+  process.disconnect();
+
+  // Node's own startup isn't the solution's CPU time
+  const baseline = process.cpuUsage();
+  process.on('exit', () => {
+    const cpu = process.cpuUsage(baseline);
+    try {
+      fs.writeSync(USAGE_FD, JSON.stringify({
+        cpu_us: cpu.user + cpu.system,
+        peak_bytes: process.resourceUsage().maxRSS * 1024,
+      }));
+    } catch (e) {
+      // The zygote has gone away; nothing to report to
+    }
+  });
+
+  // Run the solution as the main module, exactly as `node solution.js` would
+  process.argv[1] = script;
+  Module.runMain();
+});
@@ -0,0 +1,144 @@
+'use strict';
+
+// Zygote for JavaScript runs.
+//
+// Usage: node zygote.js <cpu-seconds> <output-limit-bytes> <test-dir> -- <solution.js>
+//
+// Node can't fork, so instead of forking a pre-initialized parent this keeps
+// one standby child booted ahead of time (zygote-child.js, with its CPU
+// rlimit already set). Each test hands its input to the standby and spawns
+// the next one while the test runs, so no test waits for Node startup.
+// Results use the codearena-batch protocol: per test, a JSON header line
+// followed by the test's stdout and stderr bytes.
+
+const { spawn } = require('child_process');
+const fs = require('fs');
+const os = require('os');
+const path = require('path');
+
+const cpuLimit = parseInt(process.argv[2], 10);
+const outputLimit = parseInt(process.argv[3], 10);
+const testDir = process.argv[4];
+const script = process.argv[process.argv.length - 1];
+
+// 128 + SIGXCPU, the status a CPU-limited process exits with
+const CPU_LIMIT_EXIT = 128 + os.constants.signals.SIGXCPU;
+
+const inputPath = (n) => path.join(testDir, `${n}.in`);
+
+function spawnStandby() {
+  // The soft limit must drop before the hard one
+  const limits = `ulimit -S -t ${cpuLimit} && ulimit -H -t ${cpuLimit + 1} && exec "$0" "$@"`;
+  const child = spawn('sh', ['-c', limits, process.execPath, path.join(__dirname, 'zygote-child.js')], {
+    // stdin, stdout, stderr, IPC channel, usage report
+    stdio: ['pipe', 'pipe', 'pipe', 'ipc', 'pipe'],
+  });
+  child.stdin.on('error', () => {});
+  return child;
+}
+
+function capture(stream, onOverflow) {
+  const chunks = [];
+  let size = 0;
+  let overflowed = false;
+  stream.on('data', (chunk) => {
+    const room = outputLimit + 1 - size;
+    if (room > 0) {
+      chunks.push(chunk.subarray(0, room));
+      size += Math.min(chunk.length, room);
+    }
+    if (size > outputLimit && !overflowed) {
+      overflowed = true;
+      onOverflow();
+    }
+  });
+  return {
+    data: () => Buffer.concat(chunks),
+    overflowed: () => overflowed,
+  };
+}
+
+function runTest(child, input) {
+  return new Promise((resolve) => {
+    const start = process.hrtime.bigint();
+    const kill = () => child.kill('SIGKILL');
+    const out = capture(child.stdout, kill);
+    const err = capture(child.stderr, kill);
+    let usage = '';
+    child.stdio[4].on('data', (chunk) => {
+      usage += chunk;
+    });
+
+    child.on('close', (code, signal) => {
+      let report = {};
+      try {
+        report = JSON.parse(usage);
+      } catch (e) {
+        // Killed before it could report
+      }
+      resolve({
+        exit: signal ? 128 + os.constants.signals[signal] : code,
+        cpuUs: report.cpu_us ?? -1,
+        peakBytes: report.peak_bytes ?? -1,
+        wallUs: Number((process.hrtime.bigint() - start) / 1000n),
+        stdout: out.data(),
+        stderr: err.data(),
+        overflowed: out.overflowed() || err.overflowed(),
+      });
+    });
+
+    child.send({ script });
+    child.stdin.end(input);
+  });
+}
+
+// Kill whatever a test left running, except the zygote, the standby for
+// the next test and PID 1
+function killStrays(standby) {
+  for (const name of fs.readdirSync('/proc')) {
+    const pid = Number(name);
+    if (!pid || pid === 1 || pid === process.pid || (standby && pid === standby.pid)) {
+      continue;
+    }
+    try {
+      process.kill(pid, 'SIGKILL');
+    } catch (e) {
+      // Already gone
+    }
+  }
+}
+
+async function main() {
+  let standby = fs.existsSync(inputPath(0)) ? spawnStandby() : null;
+
+  for (let n = 0; standby; n++) {
+    const child = standby;
+    standby = fs.existsSync(inputPath(n + 1)) ? spawnStandby() : null;
+
+    const result = await runTest(child, fs.readFileSync(inputPath(n)));
+    killStrays(standby);
+    const header = JSON.stringify({
+      test: n,
+      exit: result.exit,
+      cpu_us: result.cpuUs,
+      peak_bytes: result.peakBytes,
+      wall_us: result.wallUs,
+      stdout: result.stdout.length,
+      stderr: result.stderr.length,
+    });
+    fs.writeSync(1, `${header}\n`);
+    fs.writeSync(1, result.stdout);
+    fs.writeSync(1, result.stderr);
+
+    // A time or output limit ends judging anyway
+    if (result.exit === CPU_LIMIT_EXIT || result.overflowed) {
+      break;
+    }
+  }
+
+  if (standby) {
+    standby.kill('SIGKILL');
+  }
+}
+
+main();
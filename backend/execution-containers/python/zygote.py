@@ -0,0 +1,176 @@
+"""Zygote fork-server for Python runs.
+
+Usage: python zygote.py <cpu-seconds> <output-limit-bytes> <test-dir> -- <solution.py>
+
+Imports the modules solutions commonly use and compiles the solution once,
+then forks a fresh child per <test-dir>/<n>.in, so no test pays interpreter
+startup. Each child gets its input on stdin and its CPU rlimit applied
+after the fork. Results use the codearena-batch protocol: per test, a JSON
+header line followed by the test's stdout and stderr bytes. CPU time and
+peak RSS come from the child's own rusage.
+"""
+
+import builtins
+import json
+import os
+import resource
+import select
+import signal
+import sys
+import time
+import traceback
+import types
+
+# Loaded in the parent so children start with them already imported
+PRELOAD = [
+    "array", "bisect", "collections", "copy", "decimal", "fractions",
+    "functools", "heapq", "io", "itertools", "math", "operator", "random",
+    "re", "statistics", "string", "typing",
+]
+
+CHUNK_SIZE = 64 * 1024
+
+# 128 + SIGXCPU, the status a CPU-limited process exits with
+CPU_LIMIT_EXIT = 128 + signal.SIGXCPU
+
+
+def run_child(code, script, input_path, stdout_fd, stderr_fd, cpu_limit):
+    """Runs in the forked child; never returns."""
+    status = 1
+    try:
+        fd = os.open(input_path, os.O_RDONLY)
+        os.dup2(fd, 0)
+        os.close(fd)
+        os.dup2(stdout_fd, 1)
+        os.dup2(stderr_fd, 2)
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+
+        sys.stdin = open(0, "r", closefd=False)
+        sys.stdout = open(1, "w", closefd=False)
+        sys.stderr = open(2, "w", buffering=1, errors="backslashreplace", closefd=False)
+        sys.argv = [script]
+        # Children would otherwise share the parent's random state
+        import random
+        random.seed()
+
+        main = types.ModuleType("__main__")
+        main.__file__ = script
+        main.__builtins__ = builtins
+        sys.modules["__main__"] = main
+        if code is None:
+            code = compile(open(script, "rb").read(), script, "exec")
+        exec(code, main.__dict__)
+        status = 0
+    except SystemExit as e:
+        if e.code is None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException as e:
+        # Drop this frame so the traceback looks like a plain `python` run
+        tb = e.__traceback__.tb_next if e.__traceback__ else None
+        traceback.print_exception(type(e), e, tb)
+        status = 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        os._exit(status)
+
+
+def run_test(code, script, input_path, cpu_limit, output_limit):
+    """Fork a child for one test; return its exit status, output and rusage."""
+    out_r, out_w = os.pipe()
+    err_r, err_w = os.pipe()
+    start = time.monotonic()
+
+    pid = os.fork()
+    if pid == 0:
+        os.close(out_r)
+        os.close(err_r)
+        run_child(code, script, input_path, out_w, err_w, cpu_limit)
+    os.close(out_w)
+    os.close(err_w)
+
+    captured = {out_r: bytearray(), err_r: bytearray()}
+    open_fds = [out_r, err_r]
+    overflowed = False
+    while open_fds:
+        ready, _, _ = select.select(open_fds, [], [])
+        for fd in ready:
+            chunk = os.read(fd, CHUNK_SIZE)
+            if not chunk:
+                open_fds.remove(fd)
+                os.close(fd)
+                continue
+            buffer = captured[fd]
+            room = output_limit + 1 - len(buffer)
+            if room > 0:
+                buffer.extend(chunk[:room])
+            if len(buffer) > output_limit and not overflowed:
+                overflowed = True
+                os.kill(pid, signal.SIGKILL)
+
+    _, status, usage = os.wait4(pid, 0)
+    # Nothing the test left running may reach the next one; kill(-1)
+    # spares the zygote and PID 1
+    try:
+        os.kill(-1, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    wall = time.monotonic() - start
+    exit_code = os.waitstatus_to_exitcode(status)
+    if exit_code < 0:
+        exit_code = 128 - exit_code
+
+    header = {
+        "exit": exit_code,
+        "cpu_us": int((usage.ru_utime + usage.ru_stime) * 1_000_000),
+        "peak_bytes": usage.ru_maxrss * 1024,
+        "wall_us": int(wall * 1_000_000),
+        "stdout": len(captured[out_r]),
+        "stderr": len(captured[err_r]),
+    }
+    return header, bytes(captured[out_r]), bytes(captured[err_r]), overflowed
+
+
+def main():
+    cpu_limit = int(sys.argv[1])
+    output_limit = int(sys.argv[2])
+    test_dir = sys.argv[3]
+    script = sys.argv[-1]
+
+    for name in PRELOAD:
+        __import__(name)
+
+    try:
+        with open(script, "rb") as f:
+            code = compile(f.read(), script, "exec")
+    except SyntaxError:
+        # Compiled again in each child, which reports it like `python` would
+        code = None
+
+    results = sys.stdout.buffer
+    n = 0
+    while os.path.exists(os.path.join(test_dir, f"{n}.in")):
+        header, out, err, overflowed = run_test(
+            code, script, os.path.join(test_dir, f"{n}.in"), cpu_limit, output_limit
+        )
+        results.write(json.dumps({"test": n, **header}, separators=(",", ":")).encode())
+        results.write(b"\n")
+        results.write(out)
+        results.write(err)
+        results.flush()
+        # A time or output limit ends judging anyway
+        if header["exit"] == CPU_LIMIT_EXIT or overflowed:
+            break
+        n += 1
+
+
+if __name__ == "__main__":
+    main()
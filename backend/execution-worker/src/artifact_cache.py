@@ -0,0 +1,148 @@
+"""On-disk, size-bounded LRU cache of compiled submission artifacts."""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+from .logger import get_logger
+
+logger = get_logger("artifact_cache")
+
+
+@dataclass
+class CacheStats:
+    """Counters used to size the cache."""
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    evictions: int = 0
+    entries: int = 0
+    size_bytes: int = 0
+
+
+def artifact_key(language: str, image_id: str, compile_cmd: List[str], source: str) -> str:
+    """Content address for a compiled artifact.
+
+    The toolchain image and compile command are part of the key, so rebuilding
+    a runner image or changing compiler flags never serves a stale binary.
+    """
+    digest = hashlib.sha256()
+    for part in (language, image_id, "\0".join(compile_cmd)):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(source.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """Stores compiled artifacts as tar archives named by their content key."""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._stats = CacheStats()
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._load()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.tar")
+
+    def _load(self) -> None:
+        """Rebuild the LRU order from files left by a previous run."""
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                if not name.endswith(".tar"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_atime, name[:-4], st.st_size))
+
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._stats.size_bytes += size
+        self._stats.entries = len(self._entries)
+        self._evict()
+
+        if found:
+            logger.info("Artifact cache loaded", entries=self._stats.entries,
+                       size_bytes=self._stats.size_bytes)
+
+    def _evict(self) -> None:
+        """Drop least recently used artifacts until the cache fits its budget."""
+        while self._entries and self._stats.size_bytes > self.max_bytes:
+            key, size = self._entries.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+            self._stats.size_bytes -= size
+            self._stats.evictions += 1
+        self._stats.entries = len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the artifact archive for a key, or None on a miss."""
+        with self._lock:
+            if key not in self._entries:
+                self._stats.misses += 1
+                return None
+            self._entries.move_to_end(key)
+
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            with self._lock:
+                size = self._entries.pop(key, None)
+                if size is not None:
+                    self._stats.size_bytes -= size
+                    self._stats.entries = len(self._entries)
+                self._stats.misses += 1
+            return None
+
+        with self._lock:
+            self._stats.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store an artifact archive, evicting older entries if needed."""
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file and rename so readers never see a partial archive
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error("Failed to store artifact", key=key, error=str(e))
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self._stats.size_bytes += len(data) - previous
+            self._stats.stores += 1
+            self._evict()
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of hit/miss/eviction counters."""
+        with self._lock:
+            return asdict(self._stats)
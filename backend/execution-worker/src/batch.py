@@ -0,0 +1,75 @@
+"""Protocol for the runner images' batch harness (one exec per submission)."""
+
+import json
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from .measurement import RunMeasurement
+
+# Test inputs are uploaded here as <n>.in before the harness starts
+BATCH_TEST_DIR = "/code/tests"
+
+# Arguments every harness takes before its language-specific tail
+SH_BATCH_HARNESS = ["codearena-batch", "{cpu}", "{limit}", "{dir}", "--"]
+
+
+@dataclass
+class BatchRecord:
+    """One test's outcome as reported by the harness."""
+    test: int
+    exit_code: int
+    stdout: bytes
+    stderr: bytes
+    measurement: RunMeasurement = field(default_factory=RunMeasurement)
+    wall_time_ms: Optional[int] = None
+
+
+def batch_command(template: List[str], cpu_limit_seconds: int, output_limit_bytes: int) -> List[str]:
+    """Fill in a language's batch command template."""
+    return [
+        arg.format(cpu=cpu_limit_seconds, limit=output_limit_bytes, dir=BATCH_TEST_DIR)
+        for arg in template
+    ]
+
+
+def parse_batch_output(data: bytes) -> List[BatchRecord]:
+    """Decode the harness stream: a JSON header line, then stdout and stderr bytes.
+
+    Parsing stops at the first incomplete or malformed record, e.g. when the
+    batch was killed mid-test.
+    """
+    records: List[BatchRecord] = []
+    offset = 0
+    while offset < len(data):
+        end = data.find(b"\n", offset)
+        if end < 0:
+            break
+        try:
+            header = json.loads(data[offset:end])
+            test = int(header["test"])
+            exit_code = int(header["exit"])
+            stdout_size = int(header["stdout"])
+            stderr_size = int(header["stderr"])
+        except (ValueError, KeyError, TypeError):
+            break
+
+        body = end + 1
+        if len(data) < body + stdout_size + stderr_size:
+            break
+
+        cpu_us = header.get("cpu_us", -1)
+        peak_bytes = header.get("peak_bytes", -1)
+        wall_us = header.get("wall_us", -1)
+        records.append(BatchRecord(
+            test=test,
+            exit_code=exit_code,
+            stdout=data[body:body + stdout_size],
+            stderr=data[body + stdout_size:body + stdout_size + stderr_size],
+            measurement=RunMeasurement(
+                cpu_time_ms=cpu_us // 1000 if cpu_us >= 0 else None,
+                peak_memory_kb=peak_bytes // 1024 if peak_bytes >= 0 else None,
+            ),
+            wall_time_ms=wall_us // 1000 if wall_us >= 0 else None,
+        ))
+        offset = body + stdout_size + stderr_size
+    return records
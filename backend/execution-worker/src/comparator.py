@@ -0,0 +1,281 @@
+"""Streaming comparison of program output against expected output."""
+
+import json
+import math
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from enum import Enum
+from itertools import chain
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+# str, bytes, or any buffer with find() and slicing, e.g. an mmap
+Text = Union[str, bytes, Any]
+
+# Outputs are compared this many characters (or bytes) at a time
+CHUNK_SIZE = 1 << 20
+
+# Longest excerpt of a differing line or token quoted in a message
+EXCERPT_CHARS = 40
+
+
+class CheckerMode(str, Enum):
+    """How outputs are split before comparing."""
+    EXACT = "exact"    # byte for byte
+    LINES = "lines"    # line by line, ignoring surrounding whitespace and blank lines
+    TOKENS = "tokens"  # whitespace-separated tokens, ignoring layout
+    CUSTOM = "custom"  # a problem-supplied checker program, run in a sandbox
+
+
+@dataclass(frozen=True)
+class CheckerSpec:
+    """A problem's output comparison rules (problems.checker)."""
+    mode: CheckerMode = CheckerMode.LINES
+    # Numeric tokens match within this absolute or relative error
+    float_tolerance: Optional[float] = None
+    case_insensitive: bool = False
+    # Custom mode: the checker's source, its language and its time limit
+    # per test, judging testlib-style as `checker <input> <output> <answer>`
+    source: Optional[str] = None
+    language: str = "cpp"
+    time_limit_seconds: float = 5.0
+
+    @classmethod
+    def from_json(cls, data: Optional[Dict[str, Any]]) -> "CheckerSpec":
+        """Parse the checker column ({"mode": "tokens", "floatTolerance": 1e-6, ...})."""
+        data = data or {}
+        mode = CheckerMode(data.get("mode", CheckerMode.LINES.value))
+        tolerance = data.get("floatTolerance")
+        if tolerance is not None and not (isinstance(tolerance, (int, float)) and tolerance >= 0):
+            raise ValueError(f"Invalid checker floatTolerance: {tolerance!r}")
+        source = data.get("source")
+        if mode == CheckerMode.CUSTOM and not (isinstance(source, str) and source):
+            raise ValueError("Custom checker has no source")
+        time_limit = data.get("timeLimit", cls.time_limit_seconds)
+        if not (isinstance(time_limit, (int, float)) and time_limit > 0):
+            raise ValueError(f"Invalid checker timeLimit: {time_limit!r}")
+        return cls(
+            mode=mode,
+            float_tolerance=tolerance,
+            case_insensitive=bool(data.get("caseInsensitive", False)),
+            source=source if mode == CheckerMode.CUSTOM else None,
+            language=str(data.get("language", cls.language)).lower(),
+            time_limit_seconds=float(time_limit),
+        )
+
+    def cache_key(self) -> str:
+        """Identifies non-default rules in result cache keys; empty for the default."""
+        if self == DEFAULT_CHECKER:
+            return ""
+        rules: Dict[str, Any] = {"mode": self.mode.value, "floatTolerance": self.float_tolerance,
+                                 "caseInsensitive": self.case_insensitive}
+        if self.mode == CheckerMode.CUSTOM:
+            rules.update(source=self.source, language=self.language,
+                         timeLimit=self.time_limit_seconds)
+        return json.dumps(rules, sort_keys=True)
+
+
+DEFAULT_CHECKER = CheckerSpec()
+
+
+@dataclass
+class Comparison:
+    """Outcome of comparing one output."""
+    matched: bool
+    message: Optional[str] = None
+
+
+def _chunks(data: Text, separators: Tuple[str, ...]) -> Iterator[str]:
+    """About CHUNK_SIZE of a buffer at a time, as text, cut just after a separator.
+
+    A line or token never straddles two chunks; one longer than CHUNK_SIZE
+    makes its chunk grow to hold it.
+    """
+    is_str = isinstance(data, str)
+    seps = separators if is_str else tuple(sep.encode() for sep in separators)
+    start, end = 0, len(data)
+    while start < end:
+        stop = end
+        if start + CHUNK_SIZE < end:
+            for sep in seps:
+                cut = data.rfind(sep, start, start + CHUNK_SIZE)
+                if cut >= 0:
+                    stop = cut + 1
+                    break
+            else:
+                cuts = [data.find(sep, start + CHUNK_SIZE) for sep in seps]
+                cuts = [cut for cut in cuts if cut >= 0]
+                stop = min(cuts) + 1 if cuts else end
+        chunk = data[start:stop]
+        # Separators are ASCII, so a cut never splits a UTF-8 sequence
+        yield chunk if is_str else chunk.decode("utf-8", errors="replace")
+        start = stop
+
+
+def _exact_units(data: Text) -> Iterator[List[str]]:
+    """Lines with their line endings."""
+    for chunk in _chunks(data, ("\n",)):
+        yield chunk.splitlines(keepends=True)
+
+
+def _line_units(data: Text, fold_case: bool) -> Iterator[List[str]]:
+    """Stripped lines, without blank lines before the first text."""
+    started = False
+    for chunk in _chunks(data, ("\n",)):
+        if fold_case:
+            chunk = chunk.lower()
+        if chunk.endswith("\n"):
+            chunk = chunk[:-1]
+        lines = [line.strip() for line in chunk.split("\n")]
+        if not started:
+            first = next((i for i, line in enumerate(lines) if line), None)
+            if first is None:
+                continue
+            lines = lines[first:]
+            started = True
+        yield lines
+
+
+def _token_units(data: Text, fold_case: bool) -> Iterator[List[str]]:
+    for chunk in _chunks(data, ("\n", " ", "\t")):
+        yield (chunk.lower() if fold_case else chunk).split()
+
+
+def _excerpt(unit: Optional[str]) -> str:
+    if unit is None:
+        return "end of output"
+    if len(unit) > EXCERPT_CHARS:
+        unit = unit[:EXCERPT_CHARS] + "..."
+    return repr(unit)
+
+
+def _numbers_close(actual: str, expected: str, tolerance: float) -> bool:
+    try:
+        a, e = float(actual), float(expected)
+    except ValueError:
+        return False
+    if math.isnan(a) or math.isnan(e):
+        return math.isnan(a) and math.isnan(e)
+    return abs(a - e) <= tolerance * max(1.0, abs(e))
+
+
+def _units_equal(spec: CheckerSpec) -> Callable[[str, str], bool]:
+    """Whether two lines or tokens that differ as strings still match."""
+    tolerance = spec.float_tolerance
+    if spec.mode == CheckerMode.EXACT or tolerance is None:
+        return lambda actual, expected: False
+    if spec.mode == CheckerMode.TOKENS:
+        return lambda actual, expected: _numbers_close(actual, expected, tolerance)
+
+    def lines_equal(actual: str, expected: str) -> bool:
+        actual_tokens, expected_tokens = actual.split(), expected.split()
+        return len(actual_tokens) == len(expected_tokens) and all(
+            a == e or _numbers_close(a, e, tolerance)
+            for a, e in zip(actual_tokens, expected_tokens)
+        )
+    return lines_equal
+
+
+def compare_output(actual: Text, expected: Text, spec: CheckerSpec = DEFAULT_CHECKER) -> Comparison:
+    """Compare outputs incrementally, stopping at the first difference.
+
+    Either side may be a str, bytes or a memory-mapped file. Both are read
+    about CHUNK_SIZE at a time; runs of lines or tokens are compared as
+    whole lists and only a run that differs is examined unit by unit. Case
+    folding and float tolerance don't apply in exact mode. Custom checkers
+    are programs; CodeExecutor runs them.
+    """
+    if spec.mode == CheckerMode.CUSTOM:
+        raise ValueError("Custom checkers run in a sandbox, not in compare_output")
+    fold_case = spec.case_insensitive and spec.mode != CheckerMode.EXACT
+    if spec.mode == CheckerMode.EXACT:
+        actual_batches, expected_batches = _exact_units(actual), _exact_units(expected)
+    elif spec.mode == CheckerMode.LINES:
+        actual_batches = _line_units(actual, fold_case)
+        expected_batches = _line_units(expected, fold_case)
+    else:
+        actual_batches = _token_units(actual, fold_case)
+        expected_batches = _token_units(expected, fold_case)
+    unit_name = "token" if spec.mode == CheckerMode.TOKENS else "line"
+    units_equal = _units_equal(spec)
+
+    def mismatch(index: int, got: Optional[str], want: Optional[str]) -> Comparison:
+        return Comparison(
+            matched=False,
+            message=f"{unit_name} {index}: expected {_excerpt(want)}, got {_excerpt(got)}"
+        )
+
+    index = 0
+    got_batch: Optional[List[str]] = []
+    want_batch: Optional[List[str]] = []
+    got_pos = want_pos = 0
+    while True:
+        if got_pos == len(got_batch):
+            got_batch, got_pos = next(actual_batches, None), 0
+        if want_pos == len(want_batch):
+            want_batch, want_pos = next(expected_batches, None), 0
+        if got_batch is None or want_batch is None:
+            break
+        count = min(len(got_batch) - got_pos, len(want_batch) - want_pos)
+        got_run = got_batch[got_pos:got_pos + count]
+        want_run = want_batch[want_pos:want_pos + count]
+        if got_run != want_run:
+            for offset, (got, want) in enumerate(zip(got_run, want_run)):
+                if got != want and not units_equal(got, want):
+                    return mismatch(index + offset + 1, got, want)
+        index += count
+        got_pos += count
+        want_pos += count
+
+    if got_batch is None and want_batch is None:
+        return Comparison(matched=True)
+    # One side ended; in lines mode the other may only have blank lines left
+    actual_ended = got_batch is None
+    rest = want_batch[want_pos:] if actual_ended else got_batch[got_pos:]
+    for unit in chain(rest, *(expected_batches if actual_ended else actual_batches)):
+        index += 1
+        if spec.mode != CheckerMode.LINES or unit:
+            return mismatch(index, None, unit) if actual_ended else mismatch(index, unit, None)
+    return Comparison(matched=True)
+
+
+def _legacy_compare(actual: str, expected: str) -> bool:
+    """The split/join comparison the executor used before this module."""
+    def normalize(output: str) -> str:
+        lines = output.strip().split('\n')
+        return '\n'.join(line.strip() for line in lines)
+    return normalize(actual) == normalize(expected)
+
+
+def _benchmark(size_mb: int) -> None:
+    """Time and peak allocations of both comparisons on matching outputs."""
+    line = "".join(f"{i} " for i in range(12)) + "3.141592653589793\n"
+    expected = line * (size_mb * 1024 * 1024 // len(line))
+    # Same content, different layout details, so neither side short-circuits
+    actual = expected.replace(" \n", "\n") + "\n\n"
+
+    for name, run in (
+        ("legacy split/join", lambda: _legacy_compare(actual, expected)),
+        ("streaming lines", lambda: compare_output(actual, expected).matched),
+        ("streaming tokens", lambda: compare_output(
+            actual, expected, CheckerSpec(CheckerMode.TOKENS)).matched),
+        ("streaming tokens, float tolerance", lambda: compare_output(
+            actual, expected, CheckerSpec(CheckerMode.TOKENS, float_tolerance=1e-6)).matched),
+    ):
+        start = time.perf_counter()
+        assert run()
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{name:36s} {elapsed:7.2f} s   peak {peak / 1024 / 1024:8.1f} MB")
+
+
+if __name__ == "__main__":
+    # Usage: python -m src.comparator bench [size-mb]
+    if len(sys.argv) not in (2, 3) or sys.argv[1] != "bench":
+        print("Usage: python -m src.comparator bench [size-mb]")
+        sys.exit(1)
+    _benchmark(int(sys.argv[2]) if len(sys.argv) == 3 else 100)
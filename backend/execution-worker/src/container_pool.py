@@ -0,0 +1,269 @@
+"""Warm pool of pre-started sandbox containers."""
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional
+
+from docker.models.containers import Container
+
+from .logger import get_logger
+
+logger = get_logger("container_pool")
+
+# Kill everything the sandbox user started and wipe the /code tmpfs. PID 1 is
+# immune to signals from inside its namespace, so the keep-alive loop survives.
+RESET_CMD = [
+    "sh", "-c",
+    "kill -9 -1 2>/dev/null; rm -rf /code/* /code/.[!.]* /code/..?* 2>/dev/null; true",
+]
+
+
+class PoolExhaustedError(Exception):
+    """Raised when no sandbox becomes available within the lease timeout."""
+
+
+@dataclass
+class PoolConfig:
+    """Configuration for the warm container pool."""
+    min_size: int = 1
+    max_size: int = 4
+    idle_timeout_seconds: int = 300
+    max_uses: int = 50
+    health_check_interval_seconds: int = 30
+    lease_timeout_seconds: int = 60
+    maintenance_interval_seconds: int = 10
+
+
+@dataclass
+class PooledContainer:
+    """A sandbox container owned by the pool."""
+    container: Container
+    language: str
+    created_at: float = field(default_factory=time.time)
+    last_used: float = field(default_factory=time.time)
+    last_checked: float = field(default_factory=time.time)
+    uses: int = 0
+    healthy: bool = True
+
+
+class ContainerPool:
+    """Per-language pool of pre-created, pre-started sandbox containers."""
+
+    def __init__(
+        self,
+        factory: Callable[[str], Container],
+        config: Optional[PoolConfig] = None,
+    ):
+        self.factory = factory
+        self.config = config or PoolConfig()
+        self._idle: Dict[str, List[PooledContainer]] = {}
+        self._sizes: Dict[str, int] = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._maintenance_thread: Optional[threading.Thread] = None
+
+    def _spawn(self, language: str) -> PooledContainer:
+        """Create and start a new sandbox. The caller must have reserved a slot."""
+        try:
+            container = self.factory(language)
+            container.start()
+        except Exception:
+            with self._cond:
+                self._sizes[language] -= 1
+                self._cond.notify_all()
+            raise
+        logger.debug("Sandbox started", container_id=container.name, language=language)
+        return PooledContainer(container=container, language=language)
+
+    def _destroy(self, pooled: PooledContainer) -> None:
+        """Remove a sandbox and free its slot."""
+        with self._cond:
+            self._sizes[pooled.language] -= 1
+            self._cond.notify_all()
+        try:
+            pooled.container.remove(force=True)
+            logger.debug("Sandbox removed", container_id=pooled.container.name,
+                        uses=pooled.uses)
+        except Exception as e:
+            logger.error("Failed to remove sandbox",
+                        container_id=pooled.container.name, error=str(e))
+
+    def _is_healthy(self, pooled: PooledContainer) -> bool:
+        """Check that an idle sandbox is still running."""
+        if time.time() - pooled.last_checked < self.config.health_check_interval_seconds:
+            return True
+        try:
+            pooled.container.reload()
+            pooled.last_checked = time.time()
+            return pooled.container.status == "running"
+        except Exception:
+            return False
+
+    def _reset(self, pooled: PooledContainer) -> bool:
+        """Kill leftover processes and clear /code so the sandbox can be reused."""
+        try:
+            result = pooled.container.exec_run(RESET_CMD, user="1000:1000")
+            return result.exit_code == 0
+        except Exception as e:
+            logger.warning("Sandbox reset failed",
+                          container_id=pooled.container.name, error=str(e))
+            return False
+
+    def acquire(self, language: str) -> PooledContainer:
+        """Lease a sandbox for a language, creating one if the pool has room."""
+        deadline = time.time() + self.config.lease_timeout_seconds
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolExhaustedError("Container pool is shut down")
+
+                idle = self._idle.setdefault(language, [])
+                self._sizes.setdefault(language, 0)
+
+                if idle:
+                    # Most recently used first keeps the rest of the pool evictable
+                    pooled = idle.pop()
+                elif self._sizes[language] < self.config.max_size:
+                    self._sizes[language] += 1
+                    pooled = None
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise PoolExhaustedError(
+                            f"No {language} sandbox available after "
+                            f"{self.config.lease_timeout_seconds}s"
+                        )
+                    self._cond.wait(remaining)
+                    continue
+
+            if pooled is None:
+                pooled = self._spawn(language)
+            elif not self._is_healthy(pooled):
+                logger.warning("Discarding unhealthy sandbox",
+                              container_id=pooled.container.name)
+                self._destroy(pooled)
+                continue
+
+            pooled.uses += 1
+            pooled.last_used = time.time()
+            return pooled
+
+    def release(self, pooled: PooledContainer) -> None:
+        """Return a leased sandbox, recycling it if it is spent or broken."""
+        recycle = (
+            not pooled.healthy
+            or self._closed
+            or pooled.uses >= self.config.max_uses
+            or not self._reset(pooled)
+        )
+        if recycle:
+            self._destroy(pooled)
+            return
+
+        pooled.last_used = time.time()
+        with self._cond:
+            self._idle.setdefault(pooled.language, []).append(pooled)
+            self._cond.notify_all()
+
+    @contextmanager
+    def lease(self, language: str) -> Iterator[PooledContainer]:
+        """Context manager that acquires a sandbox and always releases it."""
+        pooled = self.acquire(language)
+        try:
+            yield pooled
+        except Exception:
+            pooled.healthy = False
+            raise
+        finally:
+            self.release(pooled)
+
+    def warm(self, languages: List[str]) -> None:
+        """Top each language up to the configured minimum of idle sandboxes."""
+        for language in languages:
+            while True:
+                with self._cond:
+                    if self._closed:
+                        return
+                    self._idle.setdefault(language, [])
+                    size = self._sizes.setdefault(language, 0)
+                    if size >= min(self.config.min_size, self.config.max_size):
+                        break
+                    self._sizes[language] += 1
+                try:
+                    pooled = self._spawn(language)
+                except Exception as e:
+                    logger.error("Failed to warm sandbox", language=language, error=str(e))
+                    break
+                with self._cond:
+                    self._idle[language].append(pooled)
+                    self._cond.notify_all()
+
+    def evict_idle(self) -> int:
+        """Remove sandboxes idle past the timeout, keeping the minimum warm."""
+        now = time.time()
+        evicted: List[PooledContainer] = []
+
+        with self._cond:
+            for language, idle in self._idle.items():
+                # Oldest first; never drop below min_size live sandboxes
+                idle.sort(key=lambda p: p.last_used)
+                live = self._sizes[language]
+                while idle and live > self.config.min_size:
+                    if now - idle[0].last_used < self.config.idle_timeout_seconds:
+                        break
+                    evicted.append(idle.pop(0))
+                    live -= 1
+
+        for pooled in evicted:
+            self._destroy(pooled)
+        if evicted:
+            logger.info("Evicted idle sandboxes", count=len(evicted))
+        return len(evicted)
+
+    def _maintenance_loop(self) -> None:
+        """Periodically evict idle sandboxes and refill to the minimum size."""
+        while not self._closed:
+            time.sleep(self.config.maintenance_interval_seconds)
+            try:
+                self.evict_idle()
+                self.warm(list(self._idle.keys()))
+            except Exception as e:
+                logger.error("Pool maintenance failed", error=str(e))
+
+    def start(self, languages: List[str]) -> None:
+        """Warm the pool and start the background maintenance thread."""
+        self.warm(languages)
+        if self._maintenance_thread is None:
+            self._maintenance_thread = threading.Thread(
+                target=self._maintenance_loop,
+                name="container-pool-maintenance",
+                daemon=True,
+            )
+            self._maintenance_thread.start()
+        logger.info("Container pool started", languages=languages,
+                   min_size=self.config.min_size, max_size=self.config.max_size)
+
+    def drain(self) -> None:
+        """Remove all idle sandboxes and refuse further leases."""
+        with self._cond:
+            self._closed = True
+            idle = [p for pool in self._idle.values() for p in pool]
+            self._idle = {}
+            self._cond.notify_all()
+        for pooled in idle:
+            self._destroy(pooled)
+        logger.info("Container pool drained", removed=len(idle))
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return live and idle sandbox counts per language."""
+        with self._cond:
+            return {
+                language: {
+                    "live": self._sizes.get(language, 0),
+                    "idle": len(self._idle.get(language, [])),
+                }
+                for language in self._sizes
+            }
@@ -0,0 +1,227 @@
+"""Content-addressed on-disk store of test inputs and expected outputs."""
+
+import fcntl
+import hashlib
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import IO, Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from .logger import get_logger
+
+logger = get_logger("data_store")
+
+# Where the store is bind-mounted, read-only, in every sandbox
+SANDBOX_MOUNT = "/testdata"
+
+
+@dataclass
+class StoreStats:
+    """Counters used to size the store."""
+    stores: int = 0
+    reuses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    pinned: int = 0
+    size_bytes: int = 0
+
+
+def data_digest(data: bytes) -> str:
+    """Content address of a test file."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def claim_directory(base: str) -> Tuple[str, IO]:
+    """Create a private store directory under `base` for this worker.
+
+    Workers on one host may share `base`, but reference counts are per
+    process, so each gets its own directory. It stays locked while the
+    returned lock file is open; directories whose lock is free belong to
+    workers that are gone and are removed.
+    """
+    os.makedirs(base, mode=0o755, exist_ok=True)
+    for name in os.listdir(base):
+        path = os.path.join(base, name)
+        # Hidden directories are still being set up
+        if name.startswith(".") or not os.path.isdir(path):
+            continue
+        try:
+            with open(os.path.join(path, ".lock"), "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                shutil.rmtree(path, ignore_errors=True)
+                logger.info("Removed abandoned test data store", path=path)
+        except OSError:
+            continue
+
+    # Lock before the directory becomes visible to other workers
+    staging = tempfile.mkdtemp(dir=base, prefix=".store-")
+    lock = open(os.path.join(staging, ".lock"), "a")
+    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    path = os.path.join(base, os.path.basename(staging)[1:])
+    os.rename(staging, path)
+    os.chmod(path, 0o755)
+    return path, lock
+
+
+class TestDataStore:
+    """Test files named by the SHA-256 of their content.
+
+    A file is written once, atomically, and never changed afterwards, so
+    sandboxes can read it through a read-only bind mount while the worker
+    memory-maps it. Identical data (a test shared by several problems, or
+    unchanged across test-set versions) is stored once. Files are pinned by
+    a reference count while a cached test set or a running submission uses
+    them; unpinned ones are evicted least recently used first once the store
+    is over its budget.
+    """
+
+    def __init__(self, root: str, max_bytes: int, host_root: Optional[str] = None):
+        self.root = root
+        # The same directory as the Docker daemon sees it, for bind mounts
+        self.host_root = host_root or root
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._refs: Dict[str, int] = {}
+        self._stats = StoreStats()
+        self._lock = threading.Lock()
+        os.makedirs(self.root, mode=0o755, exist_ok=True)
+        self._load()
+
+    def path(self, digest: str) -> str:
+        """Where a file lives on the worker."""
+        return os.path.join(self.root, digest[:2], digest)
+
+    @staticmethod
+    def sandbox_path(digest: str) -> str:
+        """Where a file appears inside a sandbox."""
+        return f"{SANDBOX_MOUNT}/{digest[:2]}/{digest}"
+
+    def _load(self) -> None:
+        """Adopt files left by a previous run, oldest first; drop partial writes."""
+        found = []
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if name.startswith("."):
+                    continue
+                if name.endswith(".tmp"):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name, st.st_size))
+
+        for _, digest, size in sorted(found):
+            self._entries[digest] = size
+            self._stats.size_bytes += size
+        self._evict()
+
+        if found:
+            logger.info("Test data store loaded", entries=len(self._entries),
+                       size_bytes=self._stats.size_bytes)
+
+    def put(self, data: bytes) -> str:
+        """Store data and return its digest, holding one reference to it.
+
+        The reference keeps the file from being evicted; `release` it when
+        the data is no longer needed.
+        """
+        digest = data_digest(data)
+        with self._lock:
+            if digest in self._entries:
+                self._entries.move_to_end(digest)
+                self._refs[digest] = self._refs.get(digest, 0) + 1
+                self._stats.reuses += 1
+                self._stats.pinned = len(self._refs)
+                return digest
+
+        path = self.path(digest)
+        os.makedirs(os.path.dirname(path), mode=0o755, exist_ok=True)
+
+        # Write to a temp file and rename so no reader sees a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            # Readable by the sandbox user; nobody may change it
+            os.chmod(tmp_path, 0o444)
+            os.replace(tmp_path, path)
+        except OSError:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+        with self._lock:
+            if digest not in self._entries:
+                self._entries[digest] = len(data)
+                self._stats.size_bytes += len(data)
+                self._stats.stores += 1
+            self._refs[digest] = self._refs.get(digest, 0) + 1
+            self._evict()
+        return digest
+
+    def retain(self, digests: Iterable[str]) -> None:
+        """Pin stored files against eviction."""
+        with self._lock:
+            for digest in digests:
+                self._refs[digest] = self._refs.get(digest, 0) + 1
+            self._stats.pinned = len(self._refs)
+
+    def release(self, digests: Iterable[str]) -> None:
+        """Drop references taken by `put` or `retain`."""
+        with self._lock:
+            for digest in digests:
+                refs = self._refs.get(digest, 0) - 1
+                if refs > 0:
+                    self._refs[digest] = refs
+                else:
+                    self._refs.pop(digest, None)
+                    if digest in self._entries:
+                        self._entries.move_to_end(digest)
+            self._evict()
+
+    @contextmanager
+    def mapped(self, digest: str) -> Iterator[Any]:
+        """Map a stored file read-only for the duration of a `with` block."""
+        with open(self.path(digest), "rb") as f:
+            # mmap can't map an empty file
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b""
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield mm
+
+    def _evict(self) -> None:
+        """Drop least recently used unpinned files until the store fits its budget."""
+        if self._stats.size_bytes > self.max_bytes:
+            for digest in list(self._entries):
+                if self._stats.size_bytes <= self.max_bytes:
+                    break
+                if digest in self._refs:
+                    continue
+                size = self._entries.pop(digest)
+                try:
+                    os.remove(self.path(digest))
+                except OSError:
+                    pass
+                self._stats.size_bytes -= size
+                self._stats.evictions += 1
+        self._stats.entries = len(self._entries)
+        self._stats.pinned = len(self._refs)
+
+    def stats(self) -> Dict[str, int]:
+        """Return a snapshot of the store's counters."""
+        with self._lock:
+            return asdict(self._stats)
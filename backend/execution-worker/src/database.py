@@ -0,0 +1,342 @@
+"""Pooled PostgreSQL access and write-behind submission status and result writes."""
+
+import io
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+from psycopg2.pool import ThreadedConnectionPool
+
+from .logger import get_logger
+
+logger = get_logger("database")
+
+# Statuses that end a submission; these set completed_at and always commit
+# durably before the caller moves on
+FINAL_STATUSES = {
+    "accepted",
+    "wrong_answer",
+    "time_limit_exceeded",
+    "memory_limit_exceeded",
+    "output_limit_exceeded",
+    "runtime_error",
+    "compilation_error",
+    "system_error",
+}
+
+# Applies a batch of status transitions, one row per submission, in a single
+# statement. Prepared once per connection.
+UPDATE_STATEMENT = "update_submissions"
+PREPARE_UPDATE = f"""
+    PREPARE {UPDATE_STATEMENT} (uuid[], text[], integer[], integer[], text[],
+                                timestamptz[], timestamptz[]) AS
+    UPDATE submissions AS s
+    SET status = v.status,
+        execution_time = v.execution_time,
+        memory_usage = v.memory_usage,
+        error_message = v.error_message,
+        started_at = COALESCE(v.started_at, s.started_at),
+        completed_at = COALESCE(v.completed_at, s.completed_at)
+    FROM unnest($1, $2, $3, $4, $5, $6, $7)
+        AS v(id, status, execution_time, memory_usage, error_message,
+             started_at, completed_at)
+    WHERE s.id = v.id
+"""
+EXECUTE_UPDATE = (
+    f"EXECUTE {UPDATE_STATEMENT} (%s::uuid[], %s::text[], %s::integer[], "
+    "%s::integer[], %s::text[], %s::timestamptz[], %s::timestamptz[])"
+)
+
+# Per-test results of the submissions in a batch replace any earlier ones
+# (a re-judged job). They arrive in one COPY into a per-connection staging
+# table and move over in one INSERT, which drops rows whose test case was
+# deleted meanwhile instead of failing everyone's batch on the foreign key.
+RESULT_COLUMNS = (
+    "submission_id, test_case_id, passed, actual_output, execution_time, "
+    "memory_usage, error_message, order_index"
+)
+CREATE_RESULTS_STAGING = """
+    CREATE TEMP TABLE submission_results_staging (
+        submission_id UUID, test_case_id UUID, passed BOOLEAN, actual_output TEXT,
+        execution_time INTEGER, memory_usage INTEGER, error_message TEXT,
+        order_index INTEGER
+    ) ON COMMIT DELETE ROWS
+"""
+COPY_RESULTS = f"COPY submission_results_staging ({RESULT_COLUMNS}) FROM STDIN"
+DELETE_RESULTS = "DELETE FROM submission_results WHERE submission_id = ANY(%s::uuid[])"
+INSERT_RESULTS = f"""
+    INSERT INTO submission_results ({RESULT_COLUMNS})
+    SELECT {", ".join("r." + column for column in RESULT_COLUMNS.split(", "))}
+    FROM submission_results_staging AS r
+    JOIN test_cases AS t ON t.id = r.test_case_id
+"""
+
+# COPY text format escapes
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_row(values: Sequence[Any]) -> str:
+    """Encode one row in COPY's text format."""
+    fields = []
+    for value in values:
+        if value is None:
+            fields.append("\\N")
+        elif isinstance(value, bool):
+            fields.append("t" if value else "f")
+        else:
+            fields.append(str(value).replace("\x00", "").translate(_COPY_ESCAPES))
+    return "\t".join(fields) + "\n"
+
+
+class ConnectionPool:
+    """Thread-safe PostgreSQL connections; callers block while all are in use."""
+
+    def __init__(self, dsn: str, size: int):
+        self._pool = ThreadedConnectionPool(0, size, dsn, cursor_factory=RealDictCursor)
+        # ThreadedConnectionPool raises instead of waiting when exhausted
+        self._available = threading.BoundedSemaphore(size)
+
+    def acquire(self):
+        """Check out a connection; hand it back with `release`."""
+        self._available.acquire()
+        try:
+            return self._pool.getconn()
+        except Exception:
+            self._available.release()
+            raise
+
+    def release(self, conn, broken: bool = False) -> None:
+        """Return a connection, closing it if it failed. Open transactions roll back."""
+        try:
+            self._pool.putconn(conn, close=broken or conn.closed != 0)
+        finally:
+            self._available.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Borrow a connection for the duration of a `with` block."""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken)
+
+    def close(self) -> None:
+        """Close every connection in the pool."""
+        self._pool.closeall()
+
+
+@dataclass
+class TestResultRow:
+    """One submission_results row."""
+    test_case_id: str
+    passed: bool
+    actual_output: Optional[str]
+    execution_time: Optional[int]
+    memory_usage: Optional[int]
+    error_message: Optional[str]
+    order_index: int
+
+
+@dataclass
+class SubmissionUpdate:
+    """One status transition of a submission row."""
+    submission_id: str
+    status: str
+    execution_time: Optional[int] = None
+    memory_usage: Optional[int] = None
+    error_message: Optional[str] = None
+    # Per-test results, written in the same transaction as a final status
+    results: Optional[List[TestResultRow]] = None
+    at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+@dataclass
+class _PendingRow:
+    """Coalesced transitions of one submission waiting to be written."""
+    update: SubmissionUpdate
+    started_at: Optional[datetime] = None
+    waiters: List[Future] = field(default_factory=list)
+
+
+class SubmissionWriter:
+    """Write-behind batcher for submission status updates.
+
+    Transitions from every job slot are queued and written by one thread,
+    many submissions per transaction through a prepared multi-row UPDATE.
+    Several transitions of the same submission in one batch collapse into
+    its latest state, keeping the start time of a "processing" transition.
+    Callers can wait for their write to commit; everyone queued meanwhile
+    shares that commit.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        flush_interval_ms: int = 20,
+        max_batch: int = 500,
+        async_interim_commit: bool = False
+    ):
+        self.pool = pool
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_batch = max_batch
+        # Non-final transitions may commit with synchronous_commit = off: a
+        # crash can lose them, but the final state always supersedes them
+        self.async_interim_commit = async_interim_commit
+        self._pending: Dict[str, _PendingRow] = {}
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._conn = None
+        self._thread = threading.Thread(
+            target=self._run, name="submission-writer", daemon=True
+        )
+        self._thread.start()
+
+    def update(self, update: SubmissionUpdate, wait: bool = False) -> None:
+        """Queue a transition; with `wait`, block until it is committed."""
+        future: Optional[Future] = Future() if wait else None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Submission writer is closed")
+            row = self._pending.get(update.submission_id)
+            if row is None:
+                row = self._pending[update.submission_id] = _PendingRow(update)
+            else:
+                row.update = update
+            if update.status == "processing":
+                row.started_at = update.at
+            if future is not None:
+                row.waiters.append(future)
+                self._waiting += 1
+            self._cond.notify_all()
+        if future is not None:
+            future.result()
+
+    def close(self) -> None:
+        """Write everything still queued and stop the writer thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        if self._conn is not None:
+            self.pool.release(self._conn)
+            self._conn = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                # Let other slots join the batch, unless someone is waiting
+                deadline = time.monotonic() + self.flush_interval
+                while not self._closed and not self._waiting \
+                        and len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                rows = list(self._pending.values())
+                self._pending = {}
+                self._waiting = 0
+            self._flush(rows)
+
+    def _flush(self, rows: List[_PendingRow]) -> None:
+        interim = [row for row in rows if row.update.status not in FINAL_STATUSES]
+        final = [row for row in rows if row.update.status in FINAL_STATUSES]
+        for group, durable in ((interim, not self.async_interim_commit), (final, True)):
+            if not group:
+                continue
+            try:
+                self._write(group, durable)
+            except Exception as e:
+                logger.error("Failed to write submission updates",
+                             count=len(group), error=str(e))
+                for row in group:
+                    for waiter in row.waiters:
+                        waiter.set_exception(e)
+            else:
+                for row in group:
+                    for waiter in row.waiters:
+                        waiter.set_result(None)
+
+    def _write(self, rows: List[_PendingRow], durable: bool) -> None:
+        columns = (
+            [row.update.submission_id for row in rows],
+            [row.update.status for row in rows],
+            [row.update.execution_time for row in rows],
+            [row.update.memory_usage for row in rows],
+            [row.update.error_message for row in rows],
+            [row.started_at for row in rows],
+            [row.update.at if row.update.status in FINAL_STATUSES else None for row in rows],
+        )
+        # A connection that went stale while idle gets one fresh retry
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                with conn.cursor() as cursor:
+                    if not durable:
+                        cursor.execute("SET LOCAL synchronous_commit TO OFF")
+                    cursor.execute(EXECUTE_UPDATE, columns)
+                    self._write_results(cursor, rows)
+                conn.commit()
+                logger.debug("Wrote submission updates", count=len(rows), durable=durable)
+                return
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                self.pool.release(conn, broken=True)
+                self._conn = None
+                if attempt:
+                    raise
+            except psycopg2.Error:
+                conn.rollback()
+                raise
+
+    @staticmethod
+    def _write_results(cursor, rows: List[_PendingRow]) -> None:
+        with_results = [row.update for row in rows if row.update.results is not None]
+        if not with_results:
+            return
+        cursor.execute(DELETE_RESULTS, ([update.submission_id for update in with_results],))
+        data = io.StringIO()
+        for update in with_results:
+            for result in update.results:
+                data.write(copy_row((
+                    update.submission_id,
+                    result.test_case_id,
+                    result.passed,
+                    result.actual_output,
+                    result.execution_time,
+                    result.memory_usage,
+                    result.error_message,
+                    result.order_index,
+                )))
+        data.seek(0)
+        cursor.copy_expert(COPY_RESULTS, data)
+        cursor.execute(INSERT_RESULTS)
+
+    def _connection(self):
+        """The writer's own connection, with the update statement prepared."""
+        if self._conn is None:
+            conn = self.pool.acquire()
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(PREPARE_UPDATE)
+                    cursor.execute(CREATE_RESULTS_STAGING)
+                conn.commit()
+            except Exception:
+                self.pool.release(conn, broken=True)
+                raise
+            self._conn = conn
+        return self._conn
@@ -1,17 +1,29 @@
 """Docker container management for code execution."""
 
+import io
+import math
 import os
+import select
+import signal
+import socket
+import tarfile
 import time
 import uuid
-from typing import Optional, Dict, Any, Tuple
-from dataclasses import dataclass
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Iterator, List, Set, Tuple
+from dataclasses import dataclass, replace
 from enum import Enum
 
 import docker
 from docker.models.containers import Container
 from docker.errors import ContainerError, ImageNotFound, APIError
 
+from .artifact_cache import ArtifactCache, artifact_key
+from .container_pool import ContainerPool, PoolConfig, PooledContainer
+from .data_store import SANDBOX_MOUNT, TestDataStore
 from .logger import get_logger
+from .batch import batch_command, parse_batch_output, SH_BATCH_HARNESS
+from .measurement import RunMeasurement, measured_command, parse_measurement
 
 logger = get_logger("docker_manager")
 
@@ -34,10 +46,67 @@ class ExecutionConfig:
     pids_limit: int = 50
     network_mode: str = "none"
     read_only: bool = True
-    timeout_seconds: int = 10
+    timeout_seconds: int = 10  # default CPU time limit per run, and compile wall limit
+    wall_time_factor: float = 1.5  # wall limit headroom over CPU time at cpu_quota
     tmpfs_size: str = "100m"
+    output_limit_bytes: int = 16 * 1024 * 1024  # per stream (stdout, stderr)
+    batch_languages: Tuple[str, ...] = ()  # languages run through the batch harness
+    java_profile: str = "fast-start"  # key into JAVA_PROFILES
 
 
+# Chunk sizes for streaming data over exec attach sockets
+STDIN_CHUNK_SIZE = 64 * 1024
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+# Kill every process the sandbox user started (PID 1 is immune)
+KILL_CMD = ["sh", "-c", "kill -9 -1"]
+
+# How long to wait for a killed command to exit and close its stream
+KILL_GRACE_SECONDS = 2.0
+
+# Exit status of a run stopped by its soft RLIMIT_CPU (see measurement.py)
+CPU_LIMIT_EXIT_CODE = 128 + signal.SIGXCPU
+
+# Label naming the worker that created a sandbox
+INSTANCE_LABEL = "codearena.worker"
+
+# Checker sandboxes are pooled apart from submission sandboxes of the same
+# language, so a job holding one of each never waits on its own kind
+CHECKER_POOL_PREFIX = "checker:"
+
+# testlib exit statuses that reject an output (wrong answer, presentation
+# error); 0 accepts and anything else means the checker itself failed
+CHECKER_REJECT_EXIT_CODES = {1, 2}
+
+# Cap on a checker's own stdout and stderr
+CHECKER_OUTPUT_LIMIT = 64 * 1024
+
+
+# JVM flags by profile, inserted after `javac` / `java` in the Java commands.
+# The CDS archives are built into the runner image (see java/Dockerfile); a
+# JVM that can't map one just starts without it.
+JAVA_PROFILES: Dict[str, Dict[str, List[str]]] = {
+    # JVM ergonomics only
+    "default": {"compile": [], "run": []},
+    # Shared class archives, the serial collector (no GC threads competing
+    # for a fraction of a CPU) and C1-only JIT for javac's short run. JVM
+    # logging goes to stderr so it can never reach judged stdout.
+    "fast-start": {
+        "compile": [
+            "-J-XX:SharedArchiveFile=/opt/codearena/javac.jsa",
+            "-J-XX:TieredStopAtLevel=1",
+            "-J-XX:+UseSerialGC",
+        ],
+        "run": [
+            "-XX:SharedArchiveFile=/opt/codearena/java.jsa",
+            "-XX:+TieredCompilation",
+            "-XX:+UseSerialGC",
+            "-Xlog:disable",
+            "-Xlog:all=warning:stderr",
+        ],
+    },
+}
+
 # Language-specific image and command configurations
 LANGUAGE_CONFIG: Dict[Language, Dict[str, Any]] = {
     Language.PYTHON: {
@@ -46,6 +115,9 @@ LANGUAGE_CONFIG: Dict[Language, Dict[str, Any]] = {
         "file_ext": ".py",
         "compile_cmd": None,
         "run_cmd": ["python", "/code/solution.py"],
+        # Fork-server zygote: one interpreter start per submission
+        "batch_cmd": ["python", "/opt/codearena/zygote.py", "{cpu}", "{limit}", "{dir}",
+                      "--", "/code/solution.py"],
     },
     Language.JAVASCRIPT: {
         "image": "codearena/javascript-runner:latest",
@@ -53,6 +125,9 @@ LANGUAGE_CONFIG: Dict[Language, Dict[str, Any]] = {
         "file_ext": ".js",
         "compile_cmd": None,
         "run_cmd": ["node", "/code/solution.js"],
+        # Zygote with a pre-booted standby child per test
+        "batch_cmd": ["node", "/opt/codearena/zygote.js", "{cpu}", "{limit}", "{dir}",
+                      "--", "/code/solution.js"],
     },
     Language.JAVA: {
         "image": "codearena/java-runner:latest",
@@ -60,17 +135,38 @@ LANGUAGE_CONFIG: Dict[Language, Dict[str, Any]] = {
         "file_ext": ".java",
         "compile_cmd": ["javac", "/code/Solution.java"],
         "run_cmd": ["java", "-cp", "/code", "Solution"],
+        "batch_cmd": ["java", "-Djava.security.manager=allow", "-cp", "/opt/codearena",
+                      "BatchRunner", "{cpu}", "{limit}", "{dir}", "/code", "Solution"],
+        "artifacts": "*.class",
+        # Flags from the configured JAVA_PROFILES entry apply to these
+        "jvm": True,
     },
     Language.CPP: {
         "image": "codearena/cpp-runner:latest",
         "fallback_image": "gcc:11",
         "file_ext": ".cpp",
-        "compile_cmd": ["g++", "-o", "/code/solution", "/code/solution.cpp", "-O2"],
+        # The runner image precompiles <bits/stdc++.h> into this include dir
+        # with the same flags (see cpp/Dockerfile); elsewhere it's a no-op
+        "compile_cmd": ["g++", "-o", "/code/solution", "/code/solution.cpp", "-O2",
+                        "-I", "/opt/codearena/pch"],
         "run_cmd": ["/code/solution"],
+        "batch_cmd": [*SH_BATCH_HARNESS, "/code/solution"],
+        "artifacts": "solution",
     },
 }
 
 
+@dataclass
+class CommandResult:
+    """Raw outcome of one command run in a sandbox."""
+    exit_code: int
+    stdout: bytes
+    stderr: bytes
+    execution_time_ms: int = 0
+    output_limit_exceeded: bool = False
+    timed_out: bool = False
+
+
 @dataclass
 class ExecutionResult:
     """Result of code execution."""
@@ -78,20 +174,52 @@ class ExecutionResult:
     stdout: str
     stderr: str
     exit_code: int
-    execution_time_ms: int
+    execution_time_ms: int  # CPU time when measured, else wall time
     memory_used_kb: int
+    wall_time_ms: int = 0
     timed_out: bool = False
+    time_limit_kind: Optional[str] = None  # "cpu" or "wall"
+    output_limit_exceeded: bool = False
     error: Optional[str] = None
 
 
+@dataclass
+class CheckerVerdict:
+    """A checker program's judgement of one output."""
+    accepted: bool
+    message: str = ""
+    # The checker crashed, ran out of time or couldn't be built; the
+    # submission isn't to blame
+    failed: bool = False
+
+
 class DockerManager:
     """Manages Docker containers for code execution."""
 
-    def __init__(self, config: Optional[ExecutionConfig] = None):
+    def __init__(
+        self,
+        config: Optional[ExecutionConfig] = None,
+        pool_config: Optional[PoolConfig] = None,
+        artifact_cache: Optional[ArtifactCache] = None,
+        test_store: Optional[TestDataStore] = None
+    ):
         self.config = config or ExecutionConfig()
         self.client = docker.from_env()
+        self.artifact_cache = artifact_cache
+        self.test_store = test_store
         self.container_prefix = os.getenv("CONTAINER_PREFIX", "codearena-exec")
-        logger.info("DockerManager initialized", prefix=self.container_prefix)
+        # Workers share the Docker daemon; each only ever cleans up its own
+        # sandboxes. The hostname survives restarts of the worker container.
+        self.instance_id = os.getenv("WORKER_INSTANCE_ID") or socket.gethostname()
+        self._batch_unavailable: Set[Language] = set()
+        if self.config.java_profile not in JAVA_PROFILES:
+            raise ValueError(f"Unknown Java profile: {self.config.java_profile}")
+        self.pool = ContainerPool(
+            lambda key: self._create_container(Language(key.replace(CHECKER_POOL_PREFIX, "", 1))),
+            pool_config,
+        )
+        logger.info("DockerManager initialized", prefix=self.container_prefix,
+                   instance_id=self.instance_id)
 
     def _get_image(self, language: Language) -> str:
         """Get the Docker image for a language, pulling if necessary."""
@@ -112,29 +240,40 @@ class DockerManager:
                 self.client.images.pull(fallback)
             return fallback
 
-    def _create_container(
-        self, 
-        language: Language, 
-        code: str, 
-        stdin_data: str
-    ) -> Tuple[Container, str]:
-        """Create a Docker container for code execution."""
+    def _source_filename(self, language: Language) -> str:
+        """Get the source file name a language's commands expect."""
+        lang_config = LANGUAGE_CONFIG[language]
+        if language == Language.JAVA:
+            return "Solution" + lang_config["file_ext"]
+        return "solution" + lang_config["file_ext"]
+
+    def _command(self, language: Language, name: str) -> Optional[List[str]]:
+        """A language's compile/run/batch command with its profile flags applied."""
+        lang_config = LANGUAGE_CONFIG[language]
+        cmd = lang_config.get(f"{name}_cmd")
+        if not cmd or not lang_config.get("jvm"):
+            return cmd
+        flags = JAVA_PROFILES[self.config.java_profile]
+        return [cmd[0], *flags["compile" if name == "compile" else "run"], *cmd[1:]]
+
+    def _create_container(self, language: Language) -> Container:
+        """Create a long-lived sandbox container for a language."""
         
         container_id = f"{self.container_prefix}-{uuid.uuid4().hex[:8]}"
         image = self._get_image(language)
-        lang_config = LANGUAGE_CONFIG[language]
         
-        # Prepare the code file
-        if language == Language.JAVA:
-            filename = "Solution" + lang_config["file_ext"]
-        else:
-            filename = "solution" + lang_config["file_ext"]
+        # Stored test data is read in place rather than copied into /code
+        volumes = {}
+        if self.test_store:
+            volumes[self.test_store.host_root] = {"bind": SANDBOX_MOUNT, "mode": "ro"}
 
         # Create container with security settings
         container = self.client.containers.create(
             image=image,
             name=container_id,
-            command=["sh", "-c", "sleep infinity"],  # Keep alive for commands
+            # PID 1 cannot be killed from inside the sandbox, so the pool can
+            # reset it with `kill -9 -1` and the keep-alive loop survives
+            command=["sh", "-c", "while :; do sleep 3600; done"],
             mem_limit=self.config.memory_limit,
             memswap_limit=self.config.memory_swap,
             cpu_period=self.config.cpu_period,
@@ -142,183 +281,653 @@ class DockerManager:
             pids_limit=self.config.pids_limit,
             network_mode=self.config.network_mode,
             read_only=self.config.read_only,
+            # Own cgroup namespace: /sys/fs/cgroup is this sandbox's cgroup
+            cgroupns="private",
             user="1000:1000",
             security_opt=["no-new-privileges:true"],
             tmpfs={"/code": f"size={self.config.tmpfs_size},mode=1777"},
+            volumes=volumes,
             detach=True,
             stdin_open=True,
             environment={
                 "HOME": "/tmp",
             },
+            labels={
+                "codearena.language": language.value,
+                INSTANCE_LABEL: self.instance_id,
+            },
         )
 
         logger.debug("Container created", container_id=container_id, language=language.value)
         
-        return container, filename
+        return container
+
+    def _exec_stream(
+        self,
+        container: Container,
+        cmd: list,
+        stdin_data: bytes = b"",
+        output_limit: Optional[int] = None,
+        wall_limit: Optional[float] = None
+    ) -> CommandResult:
+        """
+        Run a command, streaming stdin over the exec attach socket.
+        Input is written in chunks while output is read, so neither side can
+        fill its pipe and deadlock the other, and input size is not bounded
+        by the command line. Each output stream is capped at `output_limit`
+        bytes, and the command may run for at most `wall_limit` seconds;
+        past either limit the sandbox's processes are killed.
+        """
+        limit = output_limit if output_limit is not None else self.config.output_limit_bytes
+        output_limit_exceeded = False
+        timed_out = False
+        start_time = time.time()
+        deadline = start_time + wall_limit if wall_limit else None
+        exec_id = self.client.api.exec_create(
+            container.id,
+            cmd,
+            stdin=True,
+            environment={"HOME": "/tmp"},
+        )
+        sock = self.client.api.exec_start(exec_id, socket=True)
+        raw = sock._sock
+        raw.setblocking(False)
+        
+        streams = {1: bytearray(), 2: bytearray()}
+        frames = bytearray()
+        pending = memoryview(stdin_data)
+        if not pending:
+            raw.shutdown(socket.SHUT_WR)
+        
+        try:
+            while True:
+                wait = None
+                if deadline is not None:
+                    wait = deadline - time.time()
+                    if wait <= 0:
+                        if timed_out:
+                            # Killed but the stream never closed; give up on it
+                            break
+                        timed_out = True
+                        self._kill_processes(container)
+                        pending = pending[:0]
+                        deadline = time.time() + KILL_GRACE_SECONDS
+                        continue
+                
+                writers = [raw] if pending else []
+                readable, writable, _ = select.select([raw], writers, [], wait)
+                
+                if writable:
+                    try:
+                        sent = raw.send(pending[:STDIN_CHUNK_SIZE])
+                        pending = pending[sent:]
+                    except BlockingIOError:
+                        pass
+                    except (BrokenPipeError, ConnectionResetError):
+                        # The program exited without reading all of its input
+                        pending = pending[:0]
+                    if not pending:
+                        try:
+                            raw.shutdown(socket.SHUT_WR)
+                        except OSError:
+                            pass
+                
+                if readable:
+                    try:
+                        chunk = raw.recv(OUTPUT_CHUNK_SIZE)
+                    except BlockingIOError:
+                        continue
+                    if not chunk:
+                        break
+                    frames.extend(chunk)
+                    
+                    # Docker multiplexes streams as [type, 0, 0, 0, size(4, BE)] frames
+                    while len(frames) >= 8:
+                        size = int.from_bytes(frames[4:8], "big")
+                        if len(frames) < 8 + size:
+                            break
+                        stream = streams.get(frames[0])
+                        if stream is not None and not output_limit_exceeded:
+                            stream.extend(frames[8:8 + min(size, limit + 1 - len(stream))])
+                            if len(stream) > limit:
+                                # Stop the flood now rather than at the time limit
+                                output_limit_exceeded = True
+                                del stream[limit:]
+                                self._kill_processes(container)
+                        del frames[:8 + size]
+        finally:
+            sock.close()
+        
+        execution_time_ms = int((time.time() - start_time) * 1000)
+        
+        reap_deadline = time.time() + KILL_GRACE_SECONDS
+        info = self.client.api.exec_inspect(exec_id)
+        while info.get("Running") and time.time() < reap_deadline:
+            time.sleep(0.005)
+            info = self.client.api.exec_inspect(exec_id)
+        
+        exit_code = info.get("ExitCode")
+        return CommandResult(
+            exit_code=exit_code if exit_code is not None else 1,
+            stdout=bytes(streams[1]),
+            stderr=bytes(streams[2]),
+            execution_time_ms=execution_time_ms,
+            output_limit_exceeded=output_limit_exceeded,
+            timed_out=timed_out,
+        )
+
+    def _kill_processes(self, container: Container) -> None:
+        """Kill everything running in a sandbox, leaving the sandbox itself up."""
+        try:
+            container.exec_run(KILL_CMD)
+        except Exception as e:
+            logger.warning("Failed to kill sandbox processes",
+                          container_id=container.name, error=str(e))
 
     def _run_command(
         self, 
         container: Container, 
         cmd: list, 
         stdin_data: Optional[str] = None,
-        timeout: int = 10
-    ) -> Tuple[int, str, str, int]:
+        timeout: float = 10
+    ) -> CommandResult:
         """Run a command in the container and return results."""
         
         start_time = time.time()
         
         try:
-            # Execute command
-            exec_result = container.exec_run(
+            return self._exec_stream(
+                container,
                 cmd,
-                stdin=True if stdin_data else False,
-                demux=True,
-                environment={"HOME": "/tmp"},
+                stdin_data.encode("utf-8") if stdin_data else b"",
+                wall_limit=timeout,
             )
             
-            execution_time_ms = int((time.time() - start_time) * 1000)
-            
-            stdout = exec_result.output[0].decode("utf-8") if exec_result.output[0] else ""
-            stderr = exec_result.output[1].decode("utf-8") if exec_result.output[1] else ""
-            
-            return exec_result.exit_code, stdout, stderr, execution_time_ms
-            
         except Exception as e:
             execution_time_ms = int((time.time() - start_time) * 1000)
             logger.error("Command execution failed", error=str(e))
-            return 1, "", str(e), execution_time_ms
+            return CommandResult(1, b"", str(e).encode("utf-8"), execution_time_ms)
 
-    def execute(
-        self, 
-        language: Language, 
-        code: str, 
-        stdin_data: str = ""
+    def _artifact_key(
+        self,
+        pooled: PooledContainer,
+        language: Language,
+        code: str
+    ) -> Optional[str]:
+        """Cache key for a compiled submission, or None if it isn't cacheable."""
+        compile_cmd = self._command(language, "compile")
+        if not self.artifact_cache or not compile_cmd:
+            return None
+        image_id = pooled.container.attrs.get("Image", "")
+        return artifact_key(language.value, image_id, compile_cmd, code)
+
+    def _save_artifact(self, container: Container, language: Language, key: str) -> None:
+        """Archive the compiled output from /code into the artifact cache."""
+        pattern = LANGUAGE_CONFIG[language]["artifacts"]
+        result = container.exec_run(
+            ["sh", "-c", f"cd /code && tar -cf - {pattern}"],
+            demux=True,
+        )
+        archive = result.output[0] if result.output else None
+        if result.exit_code == 0 and archive:
+            self.artifact_cache.put(key, archive)
+        else:
+            logger.warning("Failed to archive compiled artifact", language=language.value)
+
+    def _restore_artifact(self, container: Container, archive: bytes) -> bool:
+        """Unpack a tar archive into the sandbox's /code directory.
+        
+        tar only exits after every file is written, so a zero exit status
+        means the files are in place for the next command.
+        """
+        result = self._exec_stream(
+            container, ["tar", "-xf", "-", "-C", "/code"], archive
+        )
+        return result.exit_code == 0
+
+    def _upload_files(
+        self,
+        container: Container,
+        files: Dict[str, bytes],
+        links: Optional[Dict[str, str]] = None
+    ) -> None:
+        """Place files, and symlinks to `links` targets, into /code in one exec round-trip."""
+        links = links or {}
+        buffer = io.BytesIO()
+        now = time.time()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            directories = sorted({os.path.dirname(name) for name in [*files, *links]} - {""})
+            for name in directories:
+                info = tarfile.TarInfo(name)
+                info.type = tarfile.DIRTYPE
+                info.mode = 0o755
+                info.uid = info.gid = 1000
+                info.mtime = now
+                tar.addfile(info)
+            for name, data in files.items():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mode = 0o644
+                info.uid = info.gid = 1000
+                info.mtime = now
+                tar.addfile(info, io.BytesIO(data))
+            for name, target in links.items():
+                info = tarfile.TarInfo(name)
+                info.type = tarfile.SYMTYPE
+                info.linkname = target
+                info.uid = info.gid = 1000
+                info.mtime = now
+                tar.addfile(info)
+        
+        if not self._restore_artifact(container, buffer.getvalue()):
+            raise RuntimeError(f"Failed to upload {len(files) + len(links)} file(s) to sandbox")
+
+    def _error_result(self, pooled: PooledContainer, error: Exception, start_time: float) -> ExecutionResult:
+        """Build a failed result for an exception and mark the sandbox for recycling."""
+        pooled.healthy = False
+        if isinstance(error, ContainerError):
+            logger.error("Container execution error", error=str(error))
+            kind = "Runtime Error"
+        else:
+            logger.error("Unexpected execution error", error=str(error), exc_info=True)
+            kind = "Internal Error"
+        return ExecutionResult(
+            success=False,
+            stdout="",
+            stderr=str(error),
+            exit_code=1,
+            execution_time_ms=int((time.time() - start_time) * 1000),
+            memory_used_kb=0,
+            error=kind
+        )
+
+    @contextmanager
+    def session(self, language: Language) -> Iterator[PooledContainer]:
+        """Lease a warm sandbox for the duration of one submission."""
+        with self.pool.lease(language.value) as pooled:
+            yield pooled
+
+    @contextmanager
+    def checker_session(self, language: Language) -> Iterator[PooledContainer]:
+        """Lease a sandbox for a problem's checker program.
+
+        Prepare the checker in it like a submission: `prepare` compiles it
+        once and the artifact cache serves it to every later session.
+        """
+        with self.pool.lease(CHECKER_POOL_PREFIX + language.value) as pooled:
+            yield pooled
+
+    def prepare(
+        self,
+        pooled: PooledContainer,
+        language: Language,
+        code: str
     ) -> ExecutionResult:
-        """Execute code in a secure container."""
+        """Upload the source into a sandbox and compile it once if needed."""
         
-        container = None
         start_time = time.time()
         
         try:
-            lang_config = LANGUAGE_CONFIG[language]
+            compile_cmd = self._command(language, "compile")
+            container = pooled.container
             
-            # Create container
-            container, filename = self._create_container(language, code, stdin_data)
-            container.start()
-            
-            # Write code to container
-            if language == Language.JAVA:
-                file_path = f"/code/{filename}"
-            else:
-                file_path = f"/code/{filename}"
+            # Identical source on the same toolchain skips compilation entirely
+            cache_key = self._artifact_key(pooled, language, code)
+            if cache_key:
+                archive = self.artifact_cache.get(cache_key)
+                if archive is not None and self._restore_artifact(container, archive):
+                    logger.debug("Artifact cache hit", language=language.value)
+                    return ExecutionResult(
+                        success=True,
+                        stdout="",
+                        stderr="",
+                        exit_code=0,
+                        execution_time_ms=int((time.time() - start_time) * 1000),
+                        memory_used_kb=0
+                    )
             
-            # Use exec to write file (since tmpfs is writable)
-            write_cmd = f"cat > {file_path}"
-            exec_id = self.client.api.exec_create(
-                container.id, 
-                ["sh", "-c", write_cmd],
-                stdin=True
+            # Write code to the sandbox's /code tmpfs. put_archive can't write
+            # into a tmpfs on a read-only rootfs, so tar runs inside instead.
+            self._upload_files(
+                container, {self._source_filename(language): code.encode("utf-8")}
             )
-            sock = self.client.api.exec_start(exec_id, socket=True)
-            sock._sock.sendall(code.encode("utf-8"))
-            sock._sock.close()
-            
-            # Wait for file write
-            time.sleep(0.1)
             
             # Compile if needed
-            if lang_config["compile_cmd"]:
-                exit_code, stdout, stderr, compile_time = self._run_command(
+            if compile_cmd:
+                compiled = self._run_command(
                     container, 
-                    lang_config["compile_cmd"],
+                    compile_cmd,
                     timeout=self.config.timeout_seconds
                 )
                 
-                if exit_code != 0:
+                if compiled.exit_code != 0 or compiled.timed_out or compiled.output_limit_exceeded:
                     return ExecutionResult(
                         success=False,
-                        stdout=stdout,
-                        stderr=stderr,
-                        exit_code=exit_code,
-                        execution_time_ms=compile_time,
+                        stdout=compiled.stdout.decode("utf-8", errors="replace"),
+                        stderr=compiled.stderr.decode("utf-8", errors="replace"),
+                        exit_code=compiled.exit_code,
+                        execution_time_ms=compiled.execution_time_ms,
                         memory_used_kb=0,
                         error="Compilation Error"
                     )
+                
+                logger.debug("Compiled submission", language=language.value,
+                            compile_time_ms=compiled.execution_time_ms)
+                
+                if cache_key:
+                    self._save_artifact(container, language, cache_key)
             
-            # Run the code
-            run_cmd = lang_config["run_cmd"]
+            return ExecutionResult(
+                success=True,
+                stdout="",
+                stderr="",
+                exit_code=0,
+                execution_time_ms=int((time.time() - start_time) * 1000),
+                memory_used_kb=0
+            )
             
-            # For stdin, we need to pipe it through
-            if stdin_data:
-                run_cmd = ["sh", "-c", f"echo '{stdin_data}' | {' '.join(run_cmd)}"]
+        except Exception as e:
+            return self._error_result(pooled, e, start_time)
+
+    def run(
+        self,
+        pooled: PooledContainer,
+        language: Language,
+        stdin_data: str = "",
+        time_limit_seconds: Optional[float] = None,
+        stdin_path: Optional[str] = None
+    ) -> ExecutionResult:
+        """Run the prepared program in a sandbox against one input.
+        
+        `time_limit_seconds` is the CPU time budget (defaults to
+        `timeout_seconds`). The wall-clock limit scales it by the container's
+        CPU share and `wall_time_factor`, so a program that sleeps or blocks
+        is killed too, without penalising one that is merely throttled.
+        With `stdin_path` (a file visible in the sandbox, e.g. in the test
+        data mount) the program reads that instead of `stdin_data`.
+        """
+        
+        start_time = time.time()
+        
+        try:
+            container = pooled.container
+            cpu_limit, wall_limit = self._time_limits(time_limit_seconds)
+            run_cmd = measured_command(
+                self._command(language, "run"), math.ceil(cpu_limit), stdin_path
+            )
             
-            exit_code, stdout, stderr, execution_time_ms = self._run_command(
+            # Input is streamed to the program's stdin; keep the trailing
+            # newline that line-oriented readers expect
+            if stdin_path:
+                stdin_data = ""
+            elif stdin_data and not stdin_data.endswith("\n"):
+                stdin_data += "\n"
+            
+            completed = self._run_command(
                 container,
                 run_cmd,
                 stdin_data=stdin_data,
-                timeout=self.config.timeout_seconds
+                timeout=wall_limit
             )
-            
-            # Check for timeout
-            timed_out = (time.time() - start_time) > self.config.timeout_seconds
-            
-            # Get memory usage (approximate)
-            try:
-                stats = container.stats(stream=False)
-                memory_used_kb = stats.get("memory_stats", {}).get("usage", 0) // 1024
-            except Exception:
-                memory_used_kb = 0
-            
-            return ExecutionResult(
-                success=exit_code == 0 and not timed_out,
-                stdout=stdout.strip(),
-                stderr=stderr.strip(),
-                exit_code=exit_code,
-                execution_time_ms=execution_time_ms,
-                memory_used_kb=memory_used_kb,
-                timed_out=timed_out,
-                error="Time Limit Exceeded" if timed_out else None
+            raw_stderr, measurement = parse_measurement(completed.stderr)
+            return self._run_result(
+                container, replace(completed, stderr=raw_stderr), measurement, wall_limit
             )
             
-        except ContainerError as e:
-            logger.error("Container execution error", error=str(e))
-            return ExecutionResult(
-                success=False,
-                stdout="",
-                stderr=str(e),
-                exit_code=1,
-                execution_time_ms=int((time.time() - start_time) * 1000),
-                memory_used_kb=0,
-                error="Runtime Error"
+        except Exception as e:
+            return self._error_result(pooled, e, start_time)
+
+    def _run_result(
+        self,
+        container: Container,
+        completed: CommandResult,
+        measurement: RunMeasurement,
+        wall_limit: float
+    ) -> ExecutionResult:
+        """Turn one run's raw outcome into an ExecutionResult with a verdict."""
+        exit_code = completed.exit_code
+        stdout = completed.stdout.decode("utf-8", errors="replace")
+        stderr = completed.stderr.decode("utf-8", errors="replace")
+        
+        # The CPU limit fires inside the sandbox; the wall limit is ours
+        if exit_code == CPU_LIMIT_EXIT_CODE:
+            time_limit_kind = "cpu"
+        elif completed.timed_out:
+            time_limit_kind = "wall"
+            logger.warning("Killed at wall-clock limit",
+                          container_id=container.name,
+                          wall_limit_seconds=wall_limit)
+        else:
+            time_limit_kind = None
+        timed_out = time_limit_kind is not None
+        
+        # Killed runs can't report; fall back to wall time
+        execution_time_ms = measurement.cpu_time_ms
+        if execution_time_ms is None:
+            execution_time_ms = completed.execution_time_ms
+        memory_used_kb = measurement.peak_memory_kb or 0
+        
+        if completed.output_limit_exceeded:
+            error = "Output Limit Exceeded"
+        elif time_limit_kind == "wall":
+            error = "Time Limit Exceeded (wall clock)"
+        elif timed_out:
+            error = "Time Limit Exceeded"
+        else:
+            error = None
+        
+        return ExecutionResult(
+            success=exit_code == 0 and error is None,
+            stdout=stdout.strip(),
+            stderr=stderr.strip(),
+            exit_code=exit_code,
+            execution_time_ms=execution_time_ms,
+            memory_used_kb=memory_used_kb,
+            wall_time_ms=completed.execution_time_ms,
+            timed_out=timed_out,
+            time_limit_kind=time_limit_kind,
+            output_limit_exceeded=completed.output_limit_exceeded,
+            error=error
+        )
+
+    def run_checker(
+        self,
+        pooled: PooledContainer,
+        language: Language,
+        output: str,
+        input_data: str = "",
+        answer_data: str = "",
+        time_limit_seconds: Optional[float] = None,
+        input_path: Optional[str] = None,
+        answer_path: Optional[str] = None
+    ) -> CheckerVerdict:
+        """Judge one output with the checker prepared in a sandbox.
+        
+        The checker runs as `checker <input> <output> <answer>`, the testlib
+        convention, reading the output from its stdin. Files in the test
+        data mount are passed by `input_path` and `answer_path`; other test
+        data is uploaded first. Exit status 0 accepts and 1 or 2 reject,
+        with the checker's stderr as the message.
+        """
+        container = pooled.container
+        cpu_limit, wall_limit = self._time_limits(time_limit_seconds)
+        
+        try:
+            files = {}
+            if not input_path:
+                input_path = "/code/check/input"
+                if input_data and not input_data.endswith("\n"):
+                    input_data += "\n"
+                files["check/input"] = input_data.encode("utf-8")
+            if not answer_path:
+                answer_path = "/code/check/answer"
+                files["check/answer"] = answer_data.encode("utf-8")
+            if files:
+                self._upload_files(container, files)
+            
+            completed = self._exec_stream(
+                container,
+                measured_command(
+                    [*self._command(language, "run"), input_path, "/dev/stdin", answer_path],
+                    math.ceil(cpu_limit)
+                ),
+                output.encode("utf-8"),
+                output_limit=CHECKER_OUTPUT_LIMIT,
+                wall_limit=wall_limit,
             )
         except Exception as e:
-            logger.error("Unexpected execution error", error=str(e), exc_info=True)
-            return ExecutionResult(
-                success=False,
-                stdout="",
-                stderr=str(e),
-                exit_code=1,
-                execution_time_ms=int((time.time() - start_time) * 1000),
-                memory_used_kb=0,
-                error="Internal Error"
+            pooled.healthy = False
+            logger.error("Checker run failed", error=str(e))
+            return CheckerVerdict(accepted=False, message=str(e), failed=True)
+        
+        stderr, _ = parse_measurement(completed.stderr)
+        message = stderr.decode("utf-8", errors="replace").strip()
+        if completed.timed_out or completed.exit_code == CPU_LIMIT_EXIT_CODE:
+            return CheckerVerdict(accepted=False, message="Checker exceeded its time limit",
+                                  failed=True)
+        if completed.output_limit_exceeded:
+            return CheckerVerdict(accepted=False, message="Checker exceeded its output limit",
+                                  failed=True)
+        if completed.exit_code == 0:
+            return CheckerVerdict(accepted=True, message=message)
+        if completed.exit_code in CHECKER_REJECT_EXIT_CODES:
+            return CheckerVerdict(accepted=False, message=message)
+        return CheckerVerdict(
+            accepted=False,
+            message=message or f"Checker exited with status {completed.exit_code}",
+            failed=True
+        )
+
+    def supports_batch(self, language: Language) -> bool:
+        """Whether a language is opted into the batch harness and its image has one."""
+        return (
+            language.value in self.config.batch_languages
+            and "batch_cmd" in LANGUAGE_CONFIG[language]
+            and language not in self._batch_unavailable
+        )
+
+    def run_batch(
+        self,
+        pooled: PooledContainer,
+        language: Language,
+        inputs: List[str],
+        time_limit_seconds: Optional[float] = None,
+        input_paths: Optional[List[Optional[str]]] = None
+    ) -> List[ExecutionResult]:
+        """Run the prepared program against every input in one exec.
+        
+        Returns one result per test the harness reported, in order. The list
+        is short when the batch stopped early (a time or output limit ends
+        judging anyway) or failed; callers run any remaining tests one by one.
+        Where `input_paths` names a file visible in the sandbox, the test
+        reads it through a symlink instead of an uploaded copy.
+        """
+        container = pooled.container
+        cpu_limit, wall_limit = self._time_limits(time_limit_seconds)
+        output_limit = self.config.output_limit_bytes
+        
+        files = {}
+        links = {}
+        for index, stdin_data in enumerate(inputs):
+            if input_paths and input_paths[index]:
+                links[f"tests/{index}.in"] = input_paths[index]
+                continue
+            if stdin_data and not stdin_data.endswith("\n"):
+                stdin_data += "\n"
+            files[f"tests/{index}.in"] = stdin_data.encode("utf-8")
+        
+        try:
+            self._upload_files(container, files, links)
+            completed = self._exec_stream(
+                container,
+                batch_command(self._command(language, "batch"),
+                              math.ceil(cpu_limit), output_limit),
+                # Each test's streams are capped by the harness at limit + 1
+                output_limit=len(inputs) * (2 * (output_limit + 1) + 256),
+                wall_limit=wall_limit * len(inputs),
             )
-        finally:
-            # Cleanup container
-            if container:
-                try:
-                    container.stop(timeout=1)
-                    container.remove(force=True)
-                    logger.debug("Container cleaned up", container_id=container.name)
-                except Exception as e:
-                    logger.error("Failed to cleanup container", error=str(e))
+        except Exception as e:
+            logger.warning("Batch run failed", language=language.value, error=str(e))
+            return []
+        
+        records = parse_batch_output(completed.stdout)
+        if not records and completed.exit_code == 127:
+            logger.warning("Runner image has no batch harness", language=language.value)
+            self._batch_unavailable.add(language)
+            return []
+        
+        results = []
+        for record in records:
+            stdout_over = len(record.stdout) > output_limit
+            stderr_over = len(record.stderr) > output_limit
+            results.append(self._run_result(container, CommandResult(
+                exit_code=record.exit_code,
+                stdout=record.stdout[:output_limit],
+                stderr=record.stderr[:output_limit],
+                execution_time_ms=record.wall_time_ms or record.measurement.cpu_time_ms or 0,
+                output_limit_exceeded=stdout_over or stderr_over,
+            ), record.measurement, wall_limit))
+        
+        # The test that was running when the batch was cut off
+        if len(results) < len(inputs) and (completed.timed_out or completed.output_limit_exceeded):
+            results.append(self._run_result(container, CommandResult(
+                exit_code=completed.exit_code,
+                stdout=b"",
+                stderr=b"",
+                execution_time_ms=completed.execution_time_ms,
+                output_limit_exceeded=completed.output_limit_exceeded,
+                timed_out=completed.timed_out,
+            ), RunMeasurement(), wall_limit))
+        
+        return results
+
+    def _time_limits(self, time_limit_seconds: Optional[float]) -> Tuple[float, float]:
+        """CPU and wall-clock limits for one run."""
+        cpu_limit = time_limit_seconds or self.config.timeout_seconds
+        cpu_share = 1.0
+        if self.config.cpu_quota > 0:
+            cpu_share = min(self.config.cpu_quota / self.config.cpu_period, 1.0)
+        return cpu_limit, cpu_limit / cpu_share * self.config.wall_time_factor
+
+    def execute(
+        self, 
+        language: Language, 
+        code: str, 
+        stdin_data: str = "",
+        time_limit_seconds: Optional[float] = None
+    ) -> ExecutionResult:
+        """Execute code against a single input in a secure container."""
+        
+        with self.session(language) as pooled:
+            result = self.prepare(pooled, language, code)
+            if not result.success:
+                return result
+            return self.run(pooled, language, stdin_data, time_limit_seconds)
+
+    def start_pool(self, languages: Optional[List[Language]] = None) -> None:
+        """Pre-start sandboxes so the first jobs don't pay container startup."""
+        if languages is None:
+            languages = list(Language)
+        self.pool.start([lang.value for lang in languages])
+
+    def shutdown(self) -> None:
+        """Remove all pooled sandboxes."""
+        self.pool.drain()
 
     def cleanup_orphaned_containers(self) -> int:
-        """Remove any orphaned execution containers."""
+        """Remove sandboxes a previous run of this worker left behind.
+        
+        Only containers labelled with this worker's instance ID are touched;
+        other workers on the same daemon keep theirs.
+        """
         removed = 0
         try:
             containers = self.client.containers.list(
                 all=True,
-                filters={"name": self.container_prefix}
+                filters={
+                    "name": self.container_prefix,
+                    "label": f"{INSTANCE_LABEL}={self.instance_id}",
+                }
             )
             for container in containers:
                 try:
@@ -18,11 +18,18 @@ Security:
 - Output sanitized before storage
 """
 
-from typing import List, Optional
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
 from dataclasses import dataclass
 from enum import Enum
 
-from .docker_manager import DockerManager, Language, ExecutionConfig, ExecutionResult
+from .artifact_cache import ArtifactCache
+from .comparator import DEFAULT_CHECKER, CheckerMode, CheckerSpec, compare_output
+from .container_pool import PoolConfig, PooledContainer
+from .data_store import TestDataStore
+from .docker_manager import (
+    CheckerVerdict, DockerManager, Language, ExecutionConfig, ExecutionResult,
+)
 from .logger import get_logger
 
 logger = get_logger("executor")
@@ -35,16 +42,24 @@ class SubmissionStatus(str, Enum):
     ACCEPTED = "Accepted"
     WRONG_ANSWER = "Wrong Answer"
     TIME_LIMIT_EXCEEDED = "Time Limit Exceeded"
+    OUTPUT_LIMIT_EXCEEDED = "Output Limit Exceeded"
     RUNTIME_ERROR = "Runtime Error"
     COMPILATION_ERROR = "Compilation Error"
+    SYSTEM_ERROR = "System Error"  # judging failed, e.g. a broken checker
 
 
 @dataclass
 class TestCase:
-    """A test case for validation."""
+    """A test case for validation.
+
+    Test cases backed by the test data store carry digests instead of their
+    text; `input` and `expected_output` are then empty.
+    """
     id: int
     input: str
     expected_output: str
+    input_digest: Optional[str] = None
+    expected_digest: Optional[str] = None
 
 
 @dataclass
@@ -56,6 +71,7 @@ class TestCaseResult:
     expected_output: str
     execution_time_ms: int
     error: Optional[str] = None
+    memory_used_kb: int = 0
 
 
 @dataclass
@@ -75,28 +91,89 @@ class SubmissionResult:
 class CodeExecutor:
     """Executes code against test cases and validates results."""
 
-    def __init__(self, config: Optional[ExecutionConfig] = None):
-        self.docker_manager = DockerManager(config)
+    def __init__(
+        self,
+        config: Optional[ExecutionConfig] = None,
+        pool_config: Optional[PoolConfig] = None,
+        artifact_cache: Optional[ArtifactCache] = None,
+        test_store: Optional[TestDataStore] = None
+    ):
+        self.docker_manager = DockerManager(config, pool_config, artifact_cache, test_store)
+        self.test_store = test_store
         logger.info("CodeExecutor initialized")
 
-    def _normalize_output(self, output: str) -> str:
-        """Normalize output for comparison."""
-        # Strip whitespace, normalize line endings
-        lines = output.strip().split('\n')
-        return '\n'.join(line.strip() for line in lines)
+    def _compare(self, actual: str, test_case: TestCase, checker: CheckerSpec) -> CheckerVerdict:
+        """Judge a run's output against the test case's expected output in process."""
+        if test_case.expected_digest and self.test_store:
+            with self.test_store.mapped(test_case.expected_digest) as expected:
+                comparison = compare_output(actual, expected, checker)
+        else:
+            comparison = compare_output(actual, test_case.expected_output, checker)
+        return CheckerVerdict(accepted=comparison.matched, message=comparison.message or "")
+
+    def _stored_path(self, digest: Optional[str]) -> Optional[str]:
+        """Where a stored test file appears inside a sandbox."""
+        if digest and self.test_store:
+            return self.test_store.sandbox_path(digest)
+        return None
+
+    @contextmanager
+    def _grader(self, checker: CheckerSpec) -> Iterator[Callable[[str, TestCase], CheckerVerdict]]:
+        """How a problem's outputs are judged, for the duration of a `with` block.
+
+        Custom checkers get a sandbox of their own, leased here and prepared
+        once per submission; the artifact cache keeps the compiled checker,
+        so after its first use that is a restore rather than a compile.
+        """
+        if checker.mode != CheckerMode.CUSTOM:
+            yield lambda actual, test_case: self._compare(actual, test_case, checker)
+            return
+
+        try:
+            language = Language(checker.language)
+        except ValueError:
+            failure = CheckerVerdict(accepted=False, failed=True,
+                                     message=f"Unsupported checker language: {checker.language}")
+            yield lambda actual, test_case: failure
+            return
+
+        with self.docker_manager.checker_session(language) as sandbox:
+            prepared = self.docker_manager.prepare(sandbox, language, checker.source)
+            if not prepared.success:
+                logger.error("Checker failed to build", language=language.value,
+                            error=prepared.error)
+                failure = CheckerVerdict(
+                    accepted=False, failed=True,
+                    message=f"Checker {prepared.error or 'failed'}: {prepared.stderr}".strip()
+                )
+                yield lambda actual, test_case: failure
+                return
 
-    def _compare_output(self, actual: str, expected: str) -> bool:
-        """Compare actual output with expected output."""
-        return self._normalize_output(actual) == self._normalize_output(expected)
+            def run_checker(actual: str, test_case: TestCase) -> CheckerVerdict:
+                return self.docker_manager.run_checker(
+                    sandbox, language, actual,
+                    test_case.input, test_case.expected_output,
+                    checker.time_limit_seconds,
+                    self._stored_path(test_case.input_digest),
+                    self._stored_path(test_case.expected_digest)
+                )
+            yield run_checker
 
     def execute_submission(
         self,
         submission_id: str,
         language: str,
         code: str,
-        test_cases: List[TestCase]
+        test_cases: List[TestCase],
+        time_limit_seconds: Optional[float] = None,
+        checker: CheckerSpec = DEFAULT_CHECKER
     ) -> SubmissionResult:
-        """Execute a submission against all test cases."""
+        """Execute a submission against all test cases.
+        
+        `time_limit_seconds` is the problem's per-test CPU time limit; the
+        executor default applies when it is not given. `checker` holds the
+        problem's output comparison rules.
+        """
         
         logger.info("Starting execution", 
                    submission_id=submission_id, 
@@ -119,19 +196,80 @@ class CodeExecutor:
                 total_count=len(test_cases)
             )
         
+        # Compile once per submission, then run every test case in the same sandbox
+        with self.docker_manager.session(lang) as sandbox:
+            prepared = self.docker_manager.prepare(sandbox, lang, code)
+            
+            if not prepared.success:
+                first_id = test_cases[0].id if test_cases else 0
+                first_expected = test_cases[0].expected_output if test_cases else ""
+                return SubmissionResult(
+                    submission_id=submission_id,
+                    status=(
+                        SubmissionStatus.COMPILATION_ERROR
+                        if prepared.error == "Compilation Error"
+                        else SubmissionStatus.RUNTIME_ERROR
+                    ),
+                    test_results=[TestCaseResult(
+                        test_case_id=first_id,
+                        passed=False,
+                        output=prepared.stdout,
+                        expected_output=first_expected,
+                        execution_time_ms=prepared.execution_time_ms,
+                        error=prepared.stderr or prepared.error
+                    )],
+                    total_execution_time_ms=prepared.execution_time_ms,
+                    max_memory_used_kb=0,
+                    stdout=prepared.stdout,
+                    stderr=prepared.stderr,
+                    passed_count=0,
+                    total_count=len(test_cases)
+                )
+            
+            with self._grader(checker) as grade:
+                return self._run_test_cases(
+                    submission_id, lang, sandbox, test_cases, grade, time_limit_seconds
+                )
+
+    def _run_test_cases(
+        self,
+        submission_id: str,
+        lang: Language,
+        sandbox: PooledContainer,
+        test_cases: List[TestCase],
+        grade: Callable[[str, TestCase], CheckerVerdict],
+        time_limit_seconds: Optional[float] = None
+    ) -> SubmissionResult:
+        """Run a prepared sandbox against every test case and grade each output."""
+        
         test_results: List[TestCaseResult] = []
         total_execution_time_ms = 0
         max_memory_used_kb = 0
         all_stdout = []
         all_stderr = []
         
-        for test_case in test_cases:
+        # One exec for the whole test set where the runner image supports it
+        batch_results: List[ExecutionResult] = []
+        if self.docker_manager.supports_batch(lang):
+            batch_results = self.docker_manager.run_batch(
+                sandbox, lang, [tc.input for tc in test_cases], time_limit_seconds,
+                [self._stored_path(tc.input_digest) for tc in test_cases]
+            )
+        
+        for index, test_case in enumerate(test_cases):
             logger.debug("Running test case", 
                         submission_id=submission_id,
                         test_case_id=test_case.id)
             
-            # Execute code with test case input
-            result = self.docker_manager.execute(lang, code, test_case.input)
+            # Execute the prepared program with test case input, unless the
+            # batch already did
+            if index < len(batch_results):
+                result = batch_results[index]
+            else:
+                result = self.docker_manager.run(
+                    sandbox, lang, test_case.input, time_limit_seconds,
+                    self._stored_path(test_case.input_digest)
+                )
             
             # Track metrics
             total_execution_time_ms += result.execution_time_ms
@@ -142,40 +280,25 @@ class CodeExecutor:
             if result.stderr:
                 all_stderr.append(result.stderr)
             
-            # Check for compilation error
-            if result.error == "Compilation Error":
-                return SubmissionResult(
-                    submission_id=submission_id,
-                    status=SubmissionStatus.COMPILATION_ERROR,
-                    test_results=[TestCaseResult(
-                        test_case_id=test_case.id,
-                        passed=False,
-                        output=result.stdout,
-                        expected_output=test_case.expected_output,
-                        execution_time_ms=result.execution_time_ms,
-                        error=result.stderr
-                    )],
-                    total_execution_time_ms=total_execution_time_ms,
-                    max_memory_used_kb=max_memory_used_kb,
-                    stdout=result.stdout,
-                    stderr=result.stderr,
-                    passed_count=0,
-                    total_count=len(test_cases)
+            # Check for timeout or runaway output; both end the submission
+            if result.timed_out or result.output_limit_exceeded:
+                status = (
+                    SubmissionStatus.OUTPUT_LIMIT_EXCEEDED
+                    if result.output_limit_exceeded
+                    else SubmissionStatus.TIME_LIMIT_EXCEEDED
                 )
-            
-            # Check for timeout
-            if result.timed_out:
                 test_results.append(TestCaseResult(
                     test_case_id=test_case.id,
                     passed=False,
                     output=result.stdout,
                     expected_output=test_case.expected_output,
                     execution_time_ms=result.execution_time_ms,
-                    error="Time Limit Exceeded"
+                    error=result.error or status.value,
+                    memory_used_kb=result.memory_used_kb
                 ))
                 return SubmissionResult(
                     submission_id=submission_id,
-                    status=SubmissionStatus.TIME_LIMIT_EXCEEDED,
+                    status=status,
                     test_results=test_results,
                     total_execution_time_ms=total_execution_time_ms,
                     max_memory_used_kb=max_memory_used_kb,
@@ -186,28 +309,61 @@ class CodeExecutor:
                 )
             
             # Check for runtime error
-            if not result.success and result.error != "Time Limit Exceeded":
+            if not result.success:
                 test_results.append(TestCaseResult(
                     test_case_id=test_case.id,
                     passed=False,
                     output=result.stdout,
                     expected_output=test_case.expected_output,
                     execution_time_ms=result.execution_time_ms,
-                    error=result.stderr or "Runtime Error"
+                    error=result.stderr or "Runtime Error",
+                    memory_used_kb=result.memory_used_kb
                 ))
                 # Continue running other test cases to show full results
                 continue
             
-            # Compare output
-            passed = self._compare_output(result.stdout, test_case.expected_output)
+            # Judge the output
+            verdict = grade(result.stdout, test_case)
             
+            # A checker that can't judge ends the submission; it isn't the
+            # program's fault
+            if verdict.failed:
+                logger.error("Checker failed",
+                            submission_id=submission_id,
+                            test_case_id=test_case.id,
+                            error=verdict.message)
+                test_results.append(TestCaseResult(
+                    test_case_id=test_case.id,
+                    passed=False,
+                    output=result.stdout,
+                    expected_output=test_case.expected_output,
+                    execution_time_ms=result.execution_time_ms,
+                    error=f"Checker failed: {verdict.message}",
+                    memory_used_kb=result.memory_used_kb
+                ))
+                return SubmissionResult(
+                    submission_id=submission_id,
+                    status=SubmissionStatus.SYSTEM_ERROR,
+                    test_results=test_results,
+                    total_execution_time_ms=total_execution_time_ms,
+                    max_memory_used_kb=max_memory_used_kb,
+                    stdout='\n'.join(all_stdout),
+                    stderr=f"Checker failed: {verdict.message}",
+                    passed_count=sum(1 for tr in test_results if tr.passed),
+                    total_count=len(test_cases)
+                )
+            
+            error = None
+            if not verdict.accepted:
+                error = f"Wrong Answer: {verdict.message}" if verdict.message else "Wrong Answer"
             test_results.append(TestCaseResult(
                 test_case_id=test_case.id,
-                passed=passed,
+                passed=verdict.accepted,
                 output=result.stdout,
                 expected_output=test_case.expected_output,
                 execution_time_ms=result.execution_time_ms,
-                error=None if passed else "Wrong Answer"
+                error=error,
+                memory_used_kb=result.memory_used_kb
             ))
         
         # Determine final status
@@ -244,11 +400,21 @@ class CodeExecutor:
         )
 
     def cleanup(self) -> None:
-        """Cleanup any orphaned containers."""
+        """Remove sandboxes left behind by a previous run of this worker."""
         removed = self.docker_manager.cleanup_orphaned_containers()
         if removed > 0:
             logger.info("Cleaned up orphaned containers", count=removed)
 
+    def start(self, languages: Optional[List[str]] = None) -> None:
+        """Warm the sandbox pool (for `languages`, or all of them)."""
+        self.docker_manager.start_pool(
+            [Language(lang) for lang in languages] if languages is not None else None
+        )
+
+    def shutdown(self) -> None:
+        """Remove this worker's pooled sandboxes."""
+        self.docker_manager.shutdown()
+
     def health_check(self) -> bool:
         """Check if the executor is healthy."""
         return self.docker_manager.health_check()
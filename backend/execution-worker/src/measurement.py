@@ -0,0 +1,99 @@
+"""Per-run CPU time and peak memory from the sandbox's cgroup."""
+
+import shlex
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+# Sandboxes run in a private cgroup namespace, so /sys/fs/cgroup is the
+# sandbox's own cgroup. Reads use shell builtins only to keep forks out of
+# the measured window. Values are -1 where a counter is unavailable.
+_CGROUP_READERS = r"""
+cg_cpu() {
+  cpu=-1
+  if [ -r /sys/fs/cgroup/cpu.stat ]; then
+    cpu=0
+    while read -r k v; do
+      case $k in user_usec|system_usec) cpu=$((cpu + v));; esac
+    done < /sys/fs/cgroup/cpu.stat
+  elif [ -r /sys/fs/cgroup/cpuacct/cpuacct.usage ]; then
+    read -r ns < /sys/fs/cgroup/cpuacct/cpuacct.usage
+    cpu=$((ns / 1000))
+  fi
+}
+cg_peak() {
+  peak=-1
+  for f in /sys/fs/cgroup/memory.peak /sys/fs/cgroup/memory/memory.max_usage_in_bytes; do
+    if [ -r $f ]; then read -r peak < $f; return; fi
+  done
+}
+"""
+
+# Runs the program in a child with the CPU rlimit applied, then reports the
+# counters on a trailing stderr line. The program's exit status is kept.
+# Anything the program left running is killed before the next run in the
+# sandbox; kill -1 spares the shell itself and PID 1.
+_MEASURE_SCRIPT = r"""
+cg_cpu; cpu0=$cpu
+( ulimit -S -t {soft} && ulimit -H -t {hard} && exec "$@" ){stdin}
+rc=$?
+kill -9 -1 2>/dev/null
+cg_cpu; cg_peak
+printf '\n{marker} %s %s %s\n' $cpu0 $cpu $peak >&2
+exit $rc
+"""
+
+STATS_MARKER = "@@codearena-stats"
+
+
+@dataclass
+class RunMeasurement:
+    """Resources used by one run, as seen by the sandbox cgroup."""
+    cpu_time_ms: Optional[int] = None
+    peak_memory_kb: Optional[int] = None
+
+
+def measured_command(
+    run_cmd: List[str],
+    cpu_limit_seconds: int,
+    stdin_path: Optional[str] = None
+) -> List[str]:
+    """Wrap a run command so it reports cgroup CPU time and peak memory.
+
+    With `stdin_path`, the program reads that file inside the sandbox
+    instead of the exec's stdin.
+    """
+    script = _CGROUP_READERS + _MEASURE_SCRIPT.format(
+        soft=cpu_limit_seconds, hard=cpu_limit_seconds + 1, marker=STATS_MARKER,
+        stdin=f" < {shlex.quote(stdin_path)}" if stdin_path else ""
+    )
+    return ["sh", "-c", script, "sh", *run_cmd]
+
+
+def parse_measurement(stderr: bytes) -> Tuple[bytes, RunMeasurement]:
+    """Split the stats line off a measured run's stderr.
+
+    Returns stderr as the program wrote it and the measurement. If the run
+    was killed before the wrapper could report, stderr is returned as is and
+    the measurement is empty.
+    """
+    marker = b"\n" + STATS_MARKER.encode() + b" "
+    index = stderr.rfind(marker)
+    if index < 0:
+        return stderr, RunMeasurement()
+
+    try:
+        cpu0, cpu1, peak = (
+            int(v) for v in stderr[index + len(marker):].split()
+        )
+    except ValueError:
+        return stderr, RunMeasurement()
+
+    measurement = RunMeasurement()
+    if cpu0 >= 0 and cpu1 >= cpu0:
+        measurement.cpu_time_ms = (cpu1 - cpu0) // 1000
+    if peak >= 0:
+        # The high-water mark can't be reset from inside the sandbox. When a
+        # run doesn't raise it, this is an upper bound rather than the run's
+        # own peak.
+        measurement.peak_memory_kb = peak // 1024
+    return stderr[:index], measurement
@@ -0,0 +1,189 @@
+"""Problem data loaded from PostgreSQL, cached per worker process."""
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from .comparator import DEFAULT_CHECKER, CheckerSpec
+from .data_store import TestDataStore
+from .database import ConnectionPool
+from .executor import TestCase
+from .logger import get_logger
+
+logger = get_logger("problems")
+
+# The version and the rows come from one statement, so they always match
+LOAD_TEST_SET = """
+    SELECT p.test_set_version, p.checker, tc.id, tc.input, tc.expected_output
+    FROM problems AS p
+    LEFT JOIN test_cases AS tc ON tc.problem_id = p.id
+    WHERE p.id = %s
+    ORDER BY tc.order_index, tc.id
+"""
+
+
+@dataclass
+class TestSet:
+    """A problem's test cases at one test-set version, and how they are judged."""
+    problem_id: str
+    version: int
+    test_cases: List[TestCase]
+    size_bytes: int
+    checker: CheckerSpec = DEFAULT_CHECKER
+
+    @property
+    def digests(self) -> List[str]:
+        """Test data store files the set refers to."""
+        return [
+            digest
+            for tc in self.test_cases
+            for digest in (tc.input_digest, tc.expected_digest)
+            if digest
+        ]
+
+
+def input_bytes(text: str) -> bytes:
+    """A test input as programs read it, with the trailing newline runs add."""
+    if text and not text.endswith("\n"):
+        text += "\n"
+    return text.encode("utf-8")
+
+
+class TestSetCache:
+    """In-process LRU of problem test sets, bounded by their total size.
+
+    Jobs carry the problem's test_set_version from submission time, which
+    the database bumps whenever the problem's test cases change. A cached
+    set older than the job's version is reloaded; nothing needs to be
+    invalidated explicitly. Concurrent misses on one problem share a load.
+
+    With a test data store, inputs and expected outputs are written there
+    and cached sets hold only their digests. A cached set pins its files, as
+    does every checkout until it is returned, and the size bound then limits
+    pinned data rather than memory.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        max_bytes: int = 256 * 1024 * 1024,
+        store: Optional[TestDataStore] = None
+    ):
+        self.pool = pool
+        self.max_bytes = max_bytes
+        self.store = store
+        self._sets: "OrderedDict[str, TestSet]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._loading: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @contextmanager
+    def checkout(self, problem_id: str, version: int = 0) -> Iterator[TestSet]:
+        """A problem's test set, at least as new as `version`.
+
+        Their stored files stay in place until the `with` block ends.
+        """
+        test_set = self._lookup(problem_id, version)
+        if test_set is None:
+            with self._lock:
+                loading = self._loading.setdefault(problem_id, threading.Lock())
+            with loading:
+                # Another slot may have loaded it while we waited
+                test_set = self._lookup(problem_id, version, count=False)
+                if test_set is None:
+                    test_set = self._load(problem_id)
+                    self._retain(test_set)
+                    self._store(test_set)
+        try:
+            yield test_set
+        finally:
+            self._release(test_set)
+
+    def _lookup(self, problem_id: str, version: int, count: bool = True) -> Optional[TestSet]:
+        with self._lock:
+            test_set = self._sets.get(problem_id)
+            if test_set is None or test_set.version < version:
+                self.misses += count
+                return None
+            self._sets.move_to_end(problem_id)
+            self.hits += count
+            # Under the lock, so eviction can't unpin it first
+            self._retain(test_set)
+            return test_set
+
+    def _retain(self, test_set: TestSet) -> None:
+        if self.store:
+            self.store.retain(test_set.digests)
+
+    def _release(self, test_set: TestSet) -> None:
+        if self.store:
+            self.store.release(test_set.digests)
+
+    def _load(self, problem_id: str) -> TestSet:
+        with self.pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(LOAD_TEST_SET, (problem_id,))
+                rows = cursor.fetchall()
+            conn.commit()
+
+        if not rows:
+            raise LookupError(f"Problem {problem_id} not found")
+        rows = [row for row in rows if row["id"] is not None]
+        if not rows:
+            raise LookupError(f"Problem {problem_id} has no test cases")
+
+        test_set = TestSet(
+            problem_id=problem_id,
+            version=rows[0]["test_set_version"],
+            test_cases=[],
+            size_bytes=sum(len(row["input"]) + len(row["expected_output"]) for row in rows),
+            checker=CheckerSpec.from_json(rows[0]["checker"])
+        )
+        if not self.store:
+            test_set.test_cases = [
+                TestCase(id=row["id"], input=row["input"], expected_output=row["expected_output"])
+                for row in rows
+            ]
+        else:
+            # Each put holds the cached set's reference to its file
+            try:
+                for row in rows:
+                    tc = TestCase(id=row["id"], input="", expected_output="")
+                    test_set.test_cases.append(tc)
+                    tc.input_digest = self.store.put(input_bytes(row["input"]))
+                    tc.expected_digest = self.store.put(row["expected_output"].encode("utf-8"))
+            except Exception:
+                self._release(test_set)
+                raise
+
+        logger.info("Loaded test set", problem_id=problem_id, version=test_set.version,
+                   test_count=len(test_set.test_cases), size_bytes=test_set.size_bytes,
+                   stored=self.store is not None)
+        return test_set
+
+    def _store(self, test_set: TestSet) -> None:
+        with self._lock:
+            previous = self._sets.pop(test_set.problem_id, None)
+            if previous is not None:
+                self._bytes -= previous.size_bytes
+                self._release(previous)
+            # A set larger than the whole cache is used once and not kept
+            if test_set.size_bytes > self.max_bytes:
+                self._release(test_set)
+                return
+            self._sets[test_set.problem_id] = test_set
+            self._bytes += test_set.size_bytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._sets.popitem(last=False)
+                self._bytes -= evicted.size_bytes
+                self._release(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the cache's footprint."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "entries": len(self._sets), "bytes": self._bytes}
@@ -0,0 +1,121 @@
+"""Language-affinity sharding of the execution queue."""
+
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+QUEUE_NAME = "execution-queue"
+
+# Shard name of the unsharded queue, which takes every unmapped language
+DEFAULT_SHARD = "default"
+
+
+@dataclass(frozen=True)
+class QueueShard:
+    """One BullMQ queue the worker consumes, with its selection weight."""
+    name: str
+    weight: float = 1.0
+
+    @property
+    def queue(self) -> str:
+        if self.name == DEFAULT_SHARD:
+            return QUEUE_NAME
+        return f"{QUEUE_NAME}-{self.name}"
+
+    @property
+    def job_prefix(self) -> str:
+        return f"bull:{self.queue}:"
+
+    @property
+    def prioritized_key(self) -> str:
+        return f"bull:{self.queue}:prioritized"
+
+    @property
+    def active_key(self) -> str:
+        return f"bull:{self.queue}:active"
+
+    @property
+    def marker_key(self) -> str:
+        return f"bull:{self.queue}:marker"
+
+    @property
+    def dead_letter_key(self) -> str:
+        return f"bull:{self.queue}:dead"
+
+
+def parse_shard_map(spec: str) -> Dict[str, str]:
+    """Parse QUEUE_SHARDS ("java=jvm,cpp=native") into language -> shard.
+
+    The gateway reads the same variable to route jobs, so both sides must
+    agree on it. Several languages may share a shard.
+    """
+    shard_map = {}
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        language, _, shard = entry.partition("=")
+        if not shard.strip():
+            raise ValueError(f"Invalid QUEUE_SHARDS entry: {entry!r}")
+        shard_map[language.strip().lower()] = shard.strip().lower()
+    return shard_map
+
+
+def parse_shard_weights(spec: str, known: List[str]) -> List[QueueShard]:
+    """Parse WORKER_SHARDS ("jvm:3,default:1") into the shards a worker owns.
+
+    An empty spec owns every known shard with equal weight.
+    """
+    if not spec.strip():
+        return [QueueShard(name) for name in known]
+
+    shards = []
+    for entry in spec.split(","):
+        if not entry.strip():
+            continue
+        name, _, weight = entry.partition(":")
+        name = name.strip().lower()
+        if name not in known:
+            raise ValueError(f"Unknown queue shard in WORKER_SHARDS: {name!r}")
+        shard = QueueShard(name, float(weight) if weight.strip() else 1.0)
+        if shard.weight <= 0:
+            raise ValueError(f"Queue shard weight must be positive: {entry!r}")
+        shards.append(shard)
+    return shards
+
+
+def known_shards(shard_map: Dict[str, str]) -> List[str]:
+    """Every shard name in use, the default shard first."""
+    return [DEFAULT_SHARD, *sorted(set(shard_map.values()) - {DEFAULT_SHARD})]
+
+
+def dequeue_order(
+    own: List[QueueShard],
+    others: List[QueueShard],
+    rng: Optional[random.Random] = None
+) -> List[QueueShard]:
+    """Order shards for one dequeue: own shards by weighted draw, then the rest.
+
+    Own shards are drawn without replacement with probability proportional to
+    their weight, so a "jvm:3,default:1" worker tries jvm first three times
+    out of four but still drains default when jvm is empty. `others` (work
+    stealing) are only reached when every owned shard came up empty.
+    """
+    rng = rng or random
+    # Efraimidis-Spirakis: sorting by u ** (1 / w) is a weighted shuffle
+    ranked = sorted(own, key=lambda shard: rng.random() ** (1 / shard.weight), reverse=True)
+    stolen = list(others)
+    rng.shuffle(stolen)
+    return ranked + stolen
+
+
+def shard_languages(
+    shard_map: Dict[str, str],
+    shards: List[QueueShard],
+    languages: List[str]
+) -> List[str]:
+    """Languages routed to any of `shards` (unmapped ones go to the default shard)."""
+    names = {shard.name for shard in shards}
+    return [
+        language for language in languages
+        if shard_map.get(language, DEFAULT_SHARD) in names
+    ]
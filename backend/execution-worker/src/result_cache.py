@@ -0,0 +1,193 @@
+"""Memoization of complete submission results for identical jobs."""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+
+from .comparator import DEFAULT_CHECKER, CheckerSpec
+from .executor import SubmissionResult, SubmissionStatus, TestCase, TestCaseResult
+from .logger import get_logger
+
+logger = get_logger("result_cache")
+
+KEY_PREFIX = "result-cache"
+
+# Only verdicts that depend solely on code and tests; timing-dependent and
+# infrastructure-dependent outcomes are always re-judged.
+CACHEABLE_STATUSES = {
+    SubmissionStatus.ACCEPTED,
+    SubmissionStatus.WRONG_ANSWER,
+    SubmissionStatus.COMPILATION_ERROR,
+}
+
+
+def generation_key(problem_id: str) -> str:
+    """Redis key holding a problem's cache generation."""
+    return f"{KEY_PREFIX}:problem:{problem_id}:generation"
+
+
+def submission_key(
+    problem_id: str,
+    language: str,
+    code: str,
+    test_cases: List[TestCase],
+    generation: int = 0,
+    checker: CheckerSpec = DEFAULT_CHECKER
+) -> str:
+    """Hash identifying a (problem, language, code, test set, checker) job."""
+    digest = hashlib.sha256()
+    for part in (problem_id, str(generation), language.lower(), code):
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+    # Default comparison rules leave keys as they were
+    if checker.cache_key():
+        digest.update(checker.cache_key().encode("utf-8"))
+        digest.update(b"\0")
+    for tc in test_cases:
+        for part in (str(tc.id), tc.input, tc.expected_output):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        # Stored test data is identified by its content address instead
+        for part in (tc.input_digest, tc.expected_digest):
+            if part:
+                digest.update(part.encode("utf-8"))
+                digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def result_to_json(result: SubmissionResult) -> str:
+    """Serialize a submission result for the cache."""
+    data = asdict(result)
+    data["status"] = result.status.value
+    return json.dumps(data)
+
+
+def result_from_json(payload: str, submission_id: str) -> SubmissionResult:
+    """Rebuild a cached result for a new submission."""
+    data = json.loads(payload)
+    data["submission_id"] = submission_id
+    data["status"] = SubmissionStatus(data["status"])
+    data["test_results"] = [TestCaseResult(**tr) for tr in data["test_results"]]
+    return SubmissionResult(**data)
+
+
+class ResultCache:
+    """Redis-backed result cache with an in-process LRU in front."""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        ttl_seconds: int = 3600,
+        local_max_entries: int = 1024
+    ):
+        self.redis = redis_client
+        self.ttl_seconds = ttl_seconds
+        self.local_max_entries = local_max_entries
+        self._local: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _local_get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at < time.time():
+                del self._local[key]
+                return None
+            self._local.move_to_end(key)
+            return payload
+
+    def _local_put(self, key: str, payload: str, ttl: float) -> None:
+        with self._lock:
+            self._local[key] = (time.time() + ttl, payload)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_max_entries:
+                self._local.popitem(last=False)
+
+    def key_for(
+        self,
+        problem_id: str,
+        language: str,
+        code: str,
+        test_cases: List[TestCase],
+        checker: CheckerSpec = DEFAULT_CHECKER
+    ) -> str:
+        """Build the cache key using the problem's current generation."""
+        generation = 0
+        if problem_id:
+            try:
+                generation = int(self.redis.get(generation_key(problem_id)) or 0)
+            except redis.RedisError as e:
+                logger.warning("Failed to read cache generation", error=str(e))
+        return submission_key(problem_id, language, code, test_cases, generation, checker)
+
+    def get(self, key: str, submission_id: str) -> Optional[SubmissionResult]:
+        """Look up a memoized result, re-addressed to the given submission."""
+        payload = self._local_get(key)
+
+        if payload is None:
+            try:
+                redis_key = f"{KEY_PREFIX}:{key}"
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.get(redis_key)
+                pipe.ttl(redis_key)
+                payload, ttl = pipe.execute()
+            except redis.RedisError as e:
+                logger.warning("Result cache lookup failed", error=str(e))
+                payload = None
+            if payload is not None:
+                self._local_put(key, payload, ttl if ttl and ttl > 0 else self.ttl_seconds)
+
+        with self._lock:
+            if payload is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return result_from_json(payload, submission_id)
+
+    def put(self, key: str, result: SubmissionResult) -> None:
+        """Memoize a result if its verdict is deterministic."""
+        if result.status not in CACHEABLE_STATUSES:
+            return
+
+        payload = result_to_json(result)
+        self._local_put(key, payload, self.ttl_seconds)
+        try:
+            self.redis.setex(f"{KEY_PREFIX}:{key}", self.ttl_seconds, payload)
+        except redis.RedisError as e:
+            logger.warning("Result cache store failed", error=str(e))
+
+    def invalidate_problem(self, problem_id: str) -> int:
+        """Invalidate every cached result for a problem, e.g. after its tests change."""
+        generation = self.redis.incr(generation_key(problem_id))
+        # Local entries are keyed by generation, so they can no longer match
+        logger.info("Invalidated result cache", problem_id=problem_id,
+                   generation=generation)
+        return generation
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "local_entries": len(self._local)}
+
+
+if __name__ == "__main__":
+    # Usage: python -m src.result_cache invalidate <problem-id>
+    if len(sys.argv) != 3 or sys.argv[1] != "invalidate":
+        print("Usage: python -m src.result_cache invalidate <problem-id>")
+        sys.exit(1)
+    client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379"),
+                            decode_responses=True)
+    ResultCache(client).invalidate_problem(sys.argv[2])
@@ -3,6 +3,8 @@
 from typing import List, Optional
 from dataclasses import dataclass
 
+from .comparator import CheckerMode, CheckerSpec, compare_output
+
 
 @dataclass
 class ValidationResult:
@@ -24,7 +26,12 @@ def normalize_whitespace(text: str) -> str:
     return '\n'.join(normalized_lines)
 
 
-def validate_output(actual: str, expected: str, strict: bool = False) -> ValidationResult:
+def validate_output(
+    actual: str,
+    expected: str,
+    strict: bool = False,
+    checker: Optional[CheckerSpec] = None
+) -> ValidationResult:
     """
     Validate actual output against expected output.
     
@@ -32,23 +39,21 @@ def validate_output(actual: str, expected: str, strict: bool = False) -> Validat
         actual: The actual output from code execution
         expected: The expected output
         strict: If True, require exact match. If False, allow whitespace differences.
+        checker: Comparison rules to use instead of the ones `strict` picks
     
     Returns:
         ValidationResult with validation status and details
     """
-    if strict:
-        is_valid = actual == expected
-    else:
-        normalized_actual = normalize_whitespace(actual)
-        normalized_expected = normalize_whitespace(expected)
-        is_valid = normalized_actual == normalized_expected
+    if checker is None:
+        checker = CheckerSpec(CheckerMode.EXACT if strict else CheckerMode.LINES)
+    comparison = compare_output(actual, expected, checker)
     
-    if is_valid:
+    if comparison.matched:
         return ValidationResult(is_valid=True)
     
     return ValidationResult(
         is_valid=False,
-        message="Output does not match expected",
+        message=f"Output does not match expected ({comparison.message})",
         actual=actual[:500] if len(actual) > 500 else actual,  # Truncate for display
         expected=expected[:500] if len(expected) > 500 else expected
     )
@@ -57,7 +62,8 @@ def validate_output(actual: str, expected: str, strict: bool = False) -> Validat
 def validate_test_cases(
     outputs: List[str], 
     expected_outputs: List[str],
-    strict: bool = False
+    strict: bool = False,
+    checker: Optional[CheckerSpec] = None
 ) -> List[ValidationResult]:
     """
     Validate multiple test case outputs.
@@ -66,6 +72,7 @@ def validate_test_cases(
         outputs: List of actual outputs
         expected_outputs: List of expected outputs
         strict: If True, require exact matches
+        checker: Comparison rules to use instead of the ones `strict` picks
     
     Returns:
         List of ValidationResults
@@ -76,7 +83,7 @@ def validate_test_cases(
         )
     
     return [
-        validate_output(actual, expected, strict)
+        validate_output(actual, expected, strict, checker)
         for actual, expected in zip(outputs, expected_outputs)
     ]
 
@@ -6,6 +6,7 @@ import os
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
 
 class TestDockerManager:
@@ -20,7 +21,7 @@ class TestDockerManager:
 
     def test_create_container_python(self, mock_docker_client):
         """Test creating a Python execution container"""
-        from docker_manager import DockerManager
+        from src.docker_manager import DockerManager
         
         manager = DockerManager()
         
@@ -31,6 +32,346 @@ class TestDockerManager:
         # Test that container creation works
         assert manager is not None
 
+    def test_cleanup_limited_to_own_sandboxes(self, mock_docker_client):
+        """Test that sandboxes carry the worker's label and cleanup filters on it"""
+        from src.docker_manager import DockerManager, Language
+
+        with patch.dict(os.environ, {'WORKER_INSTANCE_ID': 'worker-a'}):
+            manager = DockerManager()
+        manager._get_image = MagicMock(return_value='codearena/python-runner:latest')
+        manager._create_container(Language.PYTHON)
+        labels = mock_docker_client.containers.create.call_args.kwargs['labels']
+        assert labels['codearena.worker'] == 'worker-a'
+
+        mock_docker_client.containers.list.return_value = [MagicMock()]
+        assert manager.cleanup_orphaned_containers() == 1
+        filters = mock_docker_client.containers.list.call_args.kwargs['filters']
+        assert filters['label'] == 'codearena.worker=worker-a'
+
+    @staticmethod
+    def fake_exec_socket(mock_docker_client, respond):
+        """Wire exec_start to a socketpair whose far end runs `respond`"""
+        import socket
+        import threading
+
+        ours, theirs = socket.socketpair()
+        handle = MagicMock(_sock=ours)
+        handle.close.side_effect = ours.close
+        mock_docker_client.api.exec_create.return_value = {'Id': 'exec-1'}
+        mock_docker_client.api.exec_start.return_value = handle
+        mock_docker_client.api.exec_inspect.return_value = {'Running': False, 'ExitCode': 0}
+
+        def serve():
+            respond(theirs)
+            theirs.close()
+
+        thread = threading.Thread(target=serve)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def frame(stream, payload):
+        return bytes([stream, 0, 0, 0]) + len(payload).to_bytes(4, 'big') + payload
+
+    def test_stdin_streamed_over_attach_socket(self, mock_docker_client):
+        """Test that multi-megabyte stdin reaches the program intact"""
+        from src.docker_manager import DockerManager
+
+        stdin = (b"1 2 3 'quoted'\n" * 400000)
+        received = bytearray()
+
+        def respond(sock):
+            while True:
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                received.extend(chunk)
+            sock.sendall(self.frame(1, b'ok\n') + self.frame(2, b'warn'))
+
+        thread = self.fake_exec_socket(mock_docker_client, respond)
+        result = DockerManager()._exec_stream(MagicMock(), ['cat'], stdin)
+        thread.join()
+
+        assert bytes(received) == stdin
+        assert (result.exit_code, result.stdout, result.stderr) == (0, b'ok\n', b'warn')
+        assert not result.output_limit_exceeded
+
+    def test_output_capped_and_process_killed(self, mock_docker_client):
+        """Test that output past the cap is discarded and the program killed"""
+        from src.docker_manager import DockerManager, KILL_CMD
+
+        def respond(sock):
+            for _ in range(64):
+                sock.sendall(self.frame(1, b'y\n' * 512))
+
+        thread = self.fake_exec_socket(mock_docker_client, respond)
+        container = MagicMock()
+        result = DockerManager()._exec_stream(container, ['yes'], output_limit=4096)
+        thread.join()
+
+        assert result.output_limit_exceeded
+        assert len(result.stdout) == 4096
+        container.exec_run.assert_called_once_with(KILL_CMD)
+
+    def test_wall_limit_kills_blocked_program(self, mock_docker_client):
+        """Test that a program that never exits is killed at the wall limit"""
+        import threading
+        from src.docker_manager import DockerManager
+
+        killed = threading.Event()
+        thread = self.fake_exec_socket(mock_docker_client, lambda sock: killed.wait(5))
+        container = MagicMock()
+        container.exec_run.side_effect = lambda cmd: killed.set()
+
+        result = DockerManager()._exec_stream(container, ['sleep', '60'], wall_limit=0.2)
+        thread.join()
+
+        assert result.timed_out
+        assert killed.is_set()
+        assert result.execution_time_ms < 2000
+
+    def test_cpu_limit_reported_separately_from_wall(self, mock_docker_client):
+        """Test that SIGXCPU maps to a CPU-time TLE and the limits are applied"""
+        from src.docker_manager import (
+            DockerManager, CommandResult, CPU_LIMIT_EXIT_CODE, Language
+        )
+        from src.container_pool import PooledContainer
+
+        manager = DockerManager()
+        manager._run_command = MagicMock(return_value=CommandResult(
+            exit_code=CPU_LIMIT_EXIT_CODE, stdout=b'', stderr=b''))
+        result = manager.run(PooledContainer(MagicMock(), 'python'),
+                             Language.PYTHON, '', time_limit_seconds=2)
+
+        cmd = manager._run_command.call_args.args[1]
+        # The soft limit must drop first or lowering the hard one fails
+        assert 'ulimit -S -t 2 && ulimit -H -t 3' in cmd[2]
+        # Whatever the run left behind is killed before the next one
+        assert 'kill -9 -1' in cmd[2].split('rc=$?')[1]
+        assert cmd[4:] == ['python', '/code/solution.py']
+        # 2s of CPU at a 50% quota needs 4s of wall time, plus headroom
+        assert manager._run_command.call_args.kwargs['timeout'] == 6
+        assert result.timed_out and result.time_limit_kind == 'cpu'
+        assert result.error == 'Time Limit Exceeded'
+
+    def test_run_reports_cgroup_cpu_and_peak_memory(self, mock_docker_client):
+        """Test that cgroup counters replace wall time and container.stats"""
+        from src.docker_manager import DockerManager, CommandResult, Language
+        from src.container_pool import PooledContainer
+
+        manager = DockerManager()
+        manager._run_command = MagicMock(return_value=CommandResult(
+            exit_code=0, stdout=b'42\n', execution_time_ms=900,
+            stderr=b'debug\n@@codearena-stats 1000000 1250000 52428800\n'))
+        container = MagicMock()
+        result = manager.run(PooledContainer(container, 'python'), Language.PYTHON, '1')
+
+        assert (result.stdout, result.stderr) == ('42', 'debug')
+        assert result.execution_time_ms == 250
+        assert result.wall_time_ms == 900
+        assert result.memory_used_kb == 51200
+        container.stats.assert_not_called()
+
+    def test_source_uploaded_as_verified_tar(self, mock_docker_client):
+        """Test that the source lands in /code in one tar exec, without sleeping"""
+        import io
+        import tarfile
+        from src.docker_manager import DockerManager, CommandResult, Language
+        from src.container_pool import PooledContainer
+
+        manager = DockerManager()
+        manager._exec_stream = MagicMock(return_value=CommandResult(0, b'', b''))
+        with patch('time.sleep') as sleep:
+            result = manager.prepare(PooledContainer(MagicMock(), 'python'),
+                                     Language.PYTHON, 'print(42)')
+
+        assert result.success
+        sleep.assert_not_called()
+        cmd, archive = manager._exec_stream.call_args.args[1:3]
+        assert cmd == ['tar', '-xf', '-', '-C', '/code']
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            assert tar.getnames() == ['solution.py']
+            assert tar.extractfile('solution.py').read() == b'print(42)'
+
+    def test_batch_run_parses_harness_stream(self, mock_docker_client):
+        """Test that one batch exec yields a result per test and stops at a TLE"""
+        from src.docker_manager import DockerManager, CommandResult, Language
+        from src.container_pool import PooledContainer
+
+        stream = (
+            b'{"test":0,"exit":0,"cpu_us":12000,"peak_bytes":2097152,"stdout":3,"stderr":0}\n6\n\n'
+            b'{"test":1,"exit":152,"cpu_us":2001000,"peak_bytes":2097152,"stdout":0,"stderr":0}\n'
+        )
+        manager = DockerManager()
+        manager._upload_files = MagicMock()
+        manager._exec_stream = MagicMock(return_value=CommandResult(0, stream, b''))
+        results = manager.run_batch(PooledContainer(MagicMock(), 'cpp'), Language.CPP,
+                                    ['3', '5', '7'], time_limit_seconds=2)
+
+        files = manager._upload_files.call_args.args[1]
+        assert files == {'tests/0.in': b'3\n', 'tests/1.in': b'5\n', 'tests/2.in': b'7\n'}
+        cmd = manager._exec_stream.call_args.args[1]
+        assert cmd[:5] == ['codearena-batch', '2', str(manager.config.output_limit_bytes),
+                           '/code/tests', '--']
+        assert len(results) == 2
+        assert results[0].success and results[0].stdout == '6'
+        assert (results[0].execution_time_ms, results[0].memory_used_kb) == (12, 2048)
+        assert results[1].timed_out and results[1].time_limit_kind == 'cpu'
+
+    def test_stored_inputs_mounted_and_linked(self, mock_docker_client, tmp_path):
+        """Test that stored test data is bind-mounted and linked, not uploaded"""
+        import io
+        import tarfile
+        from src.data_store import TestDataStore
+        from src.docker_manager import DockerManager, CommandResult, Language
+        from src.container_pool import PooledContainer
+
+        store = TestDataStore(str(tmp_path), 1 << 20, host_root='/host/testdata/store-1')
+        manager = DockerManager(test_store=store)
+        manager._get_image = MagicMock(return_value='codearena/cpp-runner:latest')
+        manager._create_container(Language.CPP)
+        volumes = mock_docker_client.containers.create.call_args.kwargs['volumes']
+        assert volumes == {'/host/testdata/store-1': {'bind': '/testdata', 'mode': 'ro'}}
+
+        manager._restore_artifact = MagicMock(return_value=True)
+        manager._exec_stream = MagicMock(return_value=CommandResult(0, b'', b''))
+        manager.run_batch(PooledContainer(MagicMock(), 'cpp'), Language.CPP, ['', '5'],
+                          input_paths=['/testdata/ab/abcd', None])
+
+        archive = manager._restore_artifact.call_args.args[1]
+        with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+            link, copied = tar.getmember('tests/0.in'), tar.getmember('tests/1.in')
+            assert link.issym() and link.linkname == '/testdata/ab/abcd'
+            assert tar.extractfile(copied).read() == b'5\n'
+
+    def test_run_checker_verdicts(self, mock_docker_client):
+        """Test that checker exit statuses map to accept, reject and checker failure"""
+        from src.docker_manager import DockerManager, CommandResult, Language, CPU_LIMIT_EXIT_CODE
+        from src.container_pool import PooledContainer
+
+        manager = DockerManager()
+        manager._upload_files = MagicMock()
+        sandbox = PooledContainer(MagicMock(), 'checker:cpp')
+
+        def verdict(exit_code, stderr=b'', **kwargs):
+            manager._exec_stream = MagicMock(
+                return_value=CommandResult(exit_code, b'', stderr, **kwargs))
+            return manager.run_checker(sandbox, Language.CPP, '4', '2 2', '4',
+                                       input_path='/testdata/ab/in', answer_path='/testdata/cd/ans')
+
+        accepted = verdict(0, b'ok 1 number(s): "4"')
+        assert accepted.accepted and not accepted.failed
+        cmd, stdin = manager._exec_stream.call_args.args[1:3]
+        assert cmd[-4:] == ['/code/solution', '/testdata/ab/in', '/dev/stdin', '/testdata/cd/ans']
+        assert stdin == b'4'
+        manager._upload_files.assert_not_called()
+
+        rejected = verdict(1, b'wrong answer 1st numbers differ')
+        assert not rejected.accepted and not rejected.failed
+        assert rejected.message == 'wrong answer 1st numbers differ'
+        assert verdict(3, b'FAIL answer file is broken').failed
+        assert verdict(CPU_LIMIT_EXIT_CODE).failed
+        assert verdict(0, timed_out=True).failed
+
+        # Test data that isn't in the store is uploaded next to the checker
+        manager._exec_stream = MagicMock(return_value=CommandResult(0, b'', b''))
+        manager.run_checker(sandbox, Language.CPP, '4', '2 2', '4')
+        assert manager._upload_files.call_args.args[1] == {
+            'check/input': b'2 2\n', 'check/answer': b'4'}
+
+    def test_checker_sandboxes_pooled_apart(self, mock_docker_client):
+        """Test that checker sandboxes use their own pool key but the language's image"""
+        from src.docker_manager import DockerManager, Language
+
+        manager = DockerManager()
+        manager._create_container = MagicMock()
+        with manager.checker_session(Language.CPP) as sandbox:
+            assert sandbox.language == 'checker:cpp'
+        manager._create_container.assert_called_once_with(Language.CPP)
+
+    def test_batch_unavailable_without_harness(self, mock_docker_client):
+        """Test that an image without the harness falls back to per-test runs"""
+        from src.docker_manager import DockerManager, ExecutionConfig, CommandResult, Language
+        from src.container_pool import PooledContainer
+
+        manager = DockerManager(ExecutionConfig(batch_languages=('python',)))
+        manager._upload_files = MagicMock()
+        manager._exec_stream = MagicMock(return_value=CommandResult(127, b'', b'not found'))
+
+        assert manager.supports_batch(Language.PYTHON)
+        assert not manager.supports_batch(Language.JAVA)
+        assert manager.run_batch(PooledContainer(MagicMock(), 'python'),
+                                 Language.PYTHON, ['1']) == []
+        assert not manager.supports_batch(Language.PYTHON)
+
+    def test_java_profile_flags(self, mock_docker_client):
+        """Test that the Java profile adds CDS/JVM flags to Java commands only"""
+        from src.docker_manager import DockerManager, ExecutionConfig, Language
+
+        manager = DockerManager()
+        compile_cmd = manager._command(Language.JAVA, 'compile')
+        run_cmd = manager._command(Language.JAVA, 'run')
+        assert compile_cmd[0] == 'javac' and compile_cmd[-1] == '/code/Solution.java'
+        assert '-J-XX:SharedArchiveFile=/opt/codearena/javac.jsa' in compile_cmd
+        assert run_cmd[:2] == ['java', '-XX:SharedArchiveFile=/opt/codearena/java.jsa']
+        assert run_cmd[-3:] == ['-cp', '/code', 'Solution']
+        assert '-XX:+UseSerialGC' in manager._command(Language.JAVA, 'batch')
+        assert manager._command(Language.CPP, 'run') == ['/code/solution']
+
+        plain = DockerManager(ExecutionConfig(java_profile='default'))
+        assert plain._command(Language.JAVA, 'run') == ['java', '-cp', '/code', 'Solution']
+        with pytest.raises(ValueError):
+            DockerManager(ExecutionConfig(java_profile='bogus'))
+
+    def test_cpp_compile_uses_precompiled_header(self, mock_docker_client):
+        """Test that C++ compiles search the image's PCH dir with matching flags"""
+        from src.docker_manager import DockerManager, Language
+
+        compile_cmd = DockerManager()._command(Language.CPP, 'compile')
+        assert compile_cmd[-2:] == ['-I', '/opt/codearena/pch']
+        # cpp/Dockerfile builds the .gch with -O2; a flag mismatch disables it
+        assert '-O2' in compile_cmd
+
+    def test_python_zygote_speaks_batch_protocol(self, tmp_path):
+        """Test that the Python zygote forks a fresh __main__ per test"""
+        import subprocess
+        from src.batch import parse_batch_output
+
+        zygote = os.path.join(os.path.dirname(__file__), '..', '..',
+                              'execution-containers', 'python', 'zygote.py')
+        solution = tmp_path / 'solution.py'
+        solution.write_text(
+            'import sys\n'
+            'seen = globals().setdefault("seen", 0)\n'
+            'n = int(input())\n'
+            'if n < 0: sys.exit(3)\n'
+            'print(n * 2, seen)\n'
+        )
+        tests = tmp_path / 'tests'
+        tests.mkdir()
+        for i, value in enumerate(['3', '-1', '5']):
+            (tests / f'{i}.in').write_text(value + '\n')
+
+        completed = subprocess.run(
+            [sys.executable, zygote, '2', '1024', str(tests), '--', str(solution)],
+            capture_output=True, timeout=30,
+        )
+        records = parse_batch_output(completed.stdout)
+
+        assert [r.exit_code for r in records] == [0, 3, 0]
+        assert records[0].stdout == b'6 0\n' and records[2].stdout == b'10 0\n'
+        assert records[0].measurement.cpu_time_ms is not None
+        assert records[0].wall_time_ms is not None
+
+    def test_killed_run_falls_back_to_wall_time(self):
+        """Test that a run killed before reporting keeps its stderr intact"""
+        from src.measurement import parse_measurement
+
+        stderr, measurement = parse_measurement(b'Killed\n')
+        assert stderr == b'Killed\n'
+        assert measurement.cpu_time_ms is None
+        assert measurement.peak_memory_kb is None
+
     def test_resource_limits(self):
         """Test that resource limits are properly set"""
         # Memory limit should be 256MB
@@ -46,9 +387,327 @@ class TestDockerManager:
             assert lang in supported
 
 
+class TestContainerPool:
+    """Tests for the warm sandbox pool"""
+
+    @pytest.fixture
+    def pool(self):
+        from src.container_pool import ContainerPool, PoolConfig
+
+        def factory(language):
+            container = MagicMock()
+            container.status = 'running'
+            container.exec_run.return_value = MagicMock(exit_code=0)
+            return container
+
+        return ContainerPool(factory, PoolConfig(min_size=1, max_size=2, max_uses=3,
+                                                 lease_timeout_seconds=0))
+
+    def test_released_sandbox_is_reused(self, pool):
+        """Test that a returned sandbox is reset and leased again"""
+        first = pool.acquire('python')
+        pool.release(first)
+        second = pool.acquire('python')
+
+        assert second is first
+        assert second.uses == 2
+        first.container.exec_run.assert_called_once()
+
+    def test_recycle_after_max_uses(self, pool):
+        """Test that a sandbox is removed once it reaches max uses"""
+        pooled = pool.acquire('python')
+        pooled.uses = 3
+        pool.release(pooled)
+
+        pooled.container.remove.assert_called_once_with(force=True)
+        assert pool.stats()['python'] == {'live': 0, 'idle': 0}
+
+    def test_failed_lease_discards_sandbox(self, pool):
+        """Test that an exception inside a lease recycles the sandbox"""
+        with pytest.raises(RuntimeError):
+            with pool.lease('python') as pooled:
+                raise RuntimeError('boom')
+
+        pooled.container.remove.assert_called_once_with(force=True)
+
+    def test_max_size_is_enforced(self, pool):
+        """Test that leases beyond max_size fail once the timeout passes"""
+        from src.container_pool import PoolExhaustedError
+
+        pool.acquire('java')
+        pool.acquire('java')
+        with pytest.raises(PoolExhaustedError):
+            pool.acquire('java')
+
+    def test_idle_eviction_keeps_minimum(self, pool):
+        """Test that idle eviction never drops below min_size"""
+        pool.config.idle_timeout_seconds = 0
+        first = pool.acquire('cpp')
+        second = pool.acquire('cpp')
+        pool.release(first)
+        pool.release(second)
+
+        assert pool.evict_idle() == 1
+        assert pool.stats()['cpp'] == {'live': 1, 'idle': 1}
+
+
+class TestArtifactCache:
+    """Tests for the compiled artifact cache"""
+
+    def test_hit_miss_and_eviction_counters(self, tmp_path):
+        """Test LRU eviction by size and the counters used for sizing"""
+        from src.artifact_cache import ArtifactCache
+
+        cache = ArtifactCache(str(tmp_path), max_bytes=10)
+        cache.put('a' * 64, b'12345')
+        cache.put('b' * 64, b'12345')
+        assert cache.get('a' * 64) == b'12345'
+
+        # 'b' is now least recently used and is evicted
+        cache.put('c' * 64, b'12345')
+        assert cache.get('b' * 64) is None
+
+        stats = cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+        assert stats['evictions'] == 1
+        assert stats['size_bytes'] == 10
+
+    def test_reloads_entries_from_disk(self, tmp_path):
+        """Test that artifacts survive a worker restart"""
+        from src.artifact_cache import ArtifactCache
+
+        ArtifactCache(str(tmp_path), max_bytes=100).put('d' * 64, b'binary')
+        assert ArtifactCache(str(tmp_path), max_bytes=100).get('d' * 64) == b'binary'
+
+    def test_key_depends_on_toolchain_image(self):
+        """Test that a rebuilt runner image never reuses old artifacts"""
+        from src.artifact_cache import artifact_key
+
+        cmd = ['g++', '-O2']
+        assert artifact_key('cpp', 'sha256:1', cmd, 'int main(){}') != \
+            artifact_key('cpp', 'sha256:2', cmd, 'int main(){}')
+        assert artifact_key('cpp', 'sha256:1', cmd, 'int main(){}') == \
+            artifact_key('cpp', 'sha256:1', cmd, 'int main(){}')
+
+
+class TestResultCache:
+    """Tests for whole-submission result memoization"""
+
+    @pytest.fixture
+    def cache(self):
+        from src.result_cache import ResultCache
+
+        redis_client = MagicMock()
+        redis_client.get.return_value = None
+        redis_client.pipeline.return_value.execute.return_value = [None, -2]
+        return ResultCache(redis_client, ttl_seconds=60, local_max_entries=2)
+
+    def _result(self, status):
+        from src.executor import SubmissionResult, TestCaseResult
+
+        return SubmissionResult(
+            submission_id='sub-1', status=status,
+            test_results=[TestCaseResult(test_case_id='tc-1', passed=True, output='3',
+                                         expected_output='3', execution_time_ms=4)],
+            total_execution_time_ms=4, max_memory_used_kb=512, stdout='3', stderr='',
+            passed_count=1, total_count=1)
+
+    def test_hit_is_readdressed_to_new_submission(self, cache):
+        """Test that a memoized result is returned for the new submission id"""
+        from src.executor import SubmissionStatus
+
+        cache.put('k', self._result(SubmissionStatus.ACCEPTED))
+        hit = cache.get('k', 'sub-2')
+
+        assert hit.submission_id == 'sub-2'
+        assert hit.status == SubmissionStatus.ACCEPTED
+        assert hit.test_results[0].output == '3'
+        cache.redis.setex.assert_called_once()
+
+    def test_timing_dependent_verdicts_are_not_cached(self, cache):
+        """Test that TLE results are always re-judged"""
+        from src.executor import SubmissionStatus
+
+        cache.put('k', self._result(SubmissionStatus.TIME_LIMIT_EXCEEDED))
+        assert cache.get('k', 'sub-2') is None
+        assert cache.stats()['misses'] == 1
+
+    def test_key_changes_with_tests_and_generation(self):
+        """Test that changed test data or an invalidation yields a new key"""
+        from src.executor import TestCase
+        from src.result_cache import submission_key
+
+        tests = [TestCase(id='tc-1', input='1 2', expected_output='3')]
+        changed = [TestCase(id='tc-1', input='1 2', expected_output='4')]
+        base = submission_key('p', 'python', 'print(3)', tests)
+
+        assert base == submission_key('p', 'python', 'print(3)', tests)
+        assert base != submission_key('p', 'python', 'print(3)', changed)
+        assert base != submission_key('p', 'python', 'print(3)', tests, generation=1)
+
+
 class TestExecutor:
     """Tests for the code executor"""
 
+    @pytest.fixture
+    def executor(self):
+        with patch('docker.from_env'):
+            from src.executor import CodeExecutor
+            executor = CodeExecutor()
+        executor.docker_manager = MagicMock()
+        executor.docker_manager.supports_batch.return_value = False
+        return executor
+
+    def test_compiles_once_per_submission(self, executor):
+        """Test that the source is prepared once and run per test case"""
+        from src.docker_manager import ExecutionResult
+        from src.executor import TestCase, SubmissionStatus
+
+        ok = ExecutionResult(success=True, stdout='', stderr='', exit_code=0,
+                             execution_time_ms=5, memory_used_kb=0)
+        executor.docker_manager.prepare.return_value = ok
+        executor.docker_manager.run.return_value = ExecutionResult(
+            success=True, stdout='42', stderr='', exit_code=0,
+            execution_time_ms=3, memory_used_kb=1024)
+
+        tests = [TestCase(id=i, input=str(i), expected_output='42') for i in range(3)]
+        result = executor.execute_submission('sub-1', 'cpp', 'int main(){}', tests)
+
+        assert result.status == SubmissionStatus.ACCEPTED
+        assert executor.docker_manager.prepare.call_count == 1
+        assert executor.docker_manager.run.call_count == 3
+
+    def test_stored_tests_read_in_place(self, executor, tmp_path):
+        """Test that stored inputs run from the mount and outputs compare via mmap"""
+        from src.data_store import TestDataStore
+        from src.docker_manager import ExecutionResult
+        from src.executor import TestCase, SubmissionStatus
+
+        store = TestDataStore(str(tmp_path), 1 << 20)
+        executor.test_store = store
+        tc = TestCase(id=1, input='', expected_output='',
+                      input_digest=store.put(b'3\n'),
+                      expected_digest=store.put(b'\n1 2 \r\n\n3\n\n'))
+        executor.docker_manager.prepare.return_value = ExecutionResult(
+            success=True, stdout='', stderr='', exit_code=0,
+            execution_time_ms=5, memory_used_kb=0)
+        executor.docker_manager.run.return_value = ExecutionResult(
+            success=True, stdout='1 2\n\n3', stderr='', exit_code=0,
+            execution_time_ms=3, memory_used_kb=1024)
+
+        result = executor.execute_submission('sub-1', 'cpp', 'int main(){}', [tc])
+
+        assert result.status == SubmissionStatus.ACCEPTED
+        stdin_path = executor.docker_manager.run.call_args.args[4]
+        assert stdin_path == f'/testdata/{tc.input_digest[:2]}/{tc.input_digest}'
+
+    def test_compilation_error_skips_runs(self, executor):
+        """Test that a failed compile stops before any test case runs"""
+        from src.docker_manager import ExecutionResult
+        from src.executor import TestCase, SubmissionStatus
+
+        executor.docker_manager.prepare.return_value = ExecutionResult(
+            success=False, stdout='', stderr='error: expected ;', exit_code=1,
+            execution_time_ms=5, memory_used_kb=0, error='Compilation Error')
+
+        tests = [TestCase(id=1, input='', expected_output='')]
+        result = executor.execute_submission('sub-1', 'java', 'class Solution {', tests)
+
+        assert result.status == SubmissionStatus.COMPILATION_ERROR
+        executor.docker_manager.run.assert_not_called()
+
+    def test_batch_results_used_before_per_test_runs(self, executor):
+        """Test that tests the batch didn't report are run one by one"""
+        from src.docker_manager import ExecutionResult
+        from src.executor import TestCase, SubmissionStatus
+
+        ok = ExecutionResult(success=True, stdout='42', stderr='', exit_code=0,
+                             execution_time_ms=3, memory_used_kb=1024)
+        executor.docker_manager.prepare.return_value = ok
+        executor.docker_manager.supports_batch.return_value = True
+        executor.docker_manager.run_batch.return_value = [ok, ok]
+        executor.docker_manager.run.return_value = ok
+
+        tests = [TestCase(id=i, input=str(i), expected_output='42') for i in range(3)]
+        result = executor.execute_submission('sub-1', 'java', 'class Solution {}', tests)
+
+        assert result.status == SubmissionStatus.ACCEPTED
+        assert executor.docker_manager.run_batch.call_args.args[2] == ['0', '1', '2']
+        assert executor.docker_manager.run.call_count == 1
+
+    def test_output_limit_stops_submission(self, executor):
+        """Test that a flooding test case ends judging with OLE"""
+        from src.docker_manager import ExecutionResult
+        from src.executor import TestCase, SubmissionStatus
+
+        executor.docker_manager.prepare.return_value = ExecutionResult(
+            success=True, stdout='', stderr='', exit_code=0,
+            execution_time_ms=5, memory_used_kb=0)
+        executor.docker_manager.run.return_value = ExecutionResult(
+            success=False, stdout='y\ny', stderr='', exit_code=137,
+            execution_time_ms=40, memory_used_kb=0,
+            output_limit_exceeded=True, error='Output Limit Exceeded')
+
+        tests = [TestCase(id=i, input='', expected_output='') for i in range(3)]
+        result = executor.execute_submission('sub-1', 'python', 'while 1: print("y")', tests)
+
+        assert result.status == SubmissionStatus.OUTPUT_LIMIT_EXCEEDED
+        assert result.test_results[0].error == 'Output Limit Exceeded'
+        assert executor.docker_manager.run.call_count == 1
+
+    def test_custom_checker_judges_outputs(self, executor):
+        """Test that a custom checker is prepared once and judges every output"""
+        from src.comparator import CheckerMode, CheckerSpec
+        from src.docker_manager import CheckerVerdict, ExecutionResult, Language
+        from src.executor import TestCase, SubmissionStatus
+
+        ok = ExecutionResult(success=True, stdout='2 2', stderr='', exit_code=0,
+                             execution_time_ms=3, memory_used_kb=1024)
+        executor.docker_manager.prepare.return_value = ok
+        executor.docker_manager.run.return_value = ok
+        executor.docker_manager.run_checker.side_effect = [
+            CheckerVerdict(accepted=True),
+            CheckerVerdict(accepted=False, message='sum is 5, expected 4'),
+        ]
+        checker = CheckerSpec.from_json({'mode': 'custom', 'source': 'int main(){}', 'timeLimit': 2})
+        with pytest.raises(ValueError):
+            CheckerSpec.from_json({'mode': 'custom'})
+        assert checker.cache_key() != CheckerSpec(CheckerMode.CUSTOM, source='').cache_key()
+
+        tests = [TestCase(id=i, input='4', expected_output='1 3') for i in range(2)]
+        result = executor.execute_submission('sub-1', 'python', 'print(2, 2)', tests,
+                                             checker=checker)
+
+        assert result.status == SubmissionStatus.WRONG_ANSWER
+        assert result.test_results[1].error == 'Wrong Answer: sum is 5, expected 4'
+        executor.docker_manager.checker_session.assert_called_once_with(Language.CPP)
+        assert executor.docker_manager.prepare.call_args_list[1].args[1:] == (
+            Language.CPP, 'int main(){}')
+        assert executor.docker_manager.run_checker.call_args.args[2:6] == ('2 2', '4', '1 3', 2)
+
+    def test_checker_failure_is_system_error(self, executor):
+        """Test that a failing checker ends judging without blaming the submission"""
+        from src.comparator import CheckerMode, CheckerSpec
+        from src.docker_manager import CheckerVerdict, ExecutionResult
+        from src.executor import TestCase, SubmissionStatus
+
+        ok = ExecutionResult(success=True, stdout='1', stderr='', exit_code=0,
+                             execution_time_ms=3, memory_used_kb=1024)
+        executor.docker_manager.prepare.return_value = ok
+        executor.docker_manager.run.return_value = ok
+        executor.docker_manager.run_checker.return_value = CheckerVerdict(
+            accepted=False, message='Checker exceeded its time limit', failed=True)
+
+        tests = [TestCase(id=i, input='', expected_output='1') for i in range(3)]
+        result = executor.execute_submission(
+            'sub-1', 'python', 'print(1)', tests,
+            checker=CheckerSpec(CheckerMode.CUSTOM, source='int main(){}'))
+
+        assert result.status == SubmissionStatus.SYSTEM_ERROR
+        assert result.stderr == 'Checker failed: Checker exceeded its time limit'
+        assert executor.docker_manager.run_checker.call_count == 1
+
     def test_parse_json_output(self):
         """Test parsing JSON output from execution"""
         output = '{"result": [0, 1]}'
@@ -100,6 +759,77 @@ class TestTestValidator:
         actual = 2.50000001
         assert abs(expected - actual) < 0.0001
 
+    def test_streaming_comparison_keeps_judge_rules(self):
+        """Test that the default line mode matches the old split/join comparison"""
+        from src.comparator import compare_output, _legacy_compare
+
+        cases = [
+            ('1 2\n3', '1 2\n3\n'), ('1 2\n3', '1 2\n4'), ('a\n\nb', 'a\nb'),
+            ('a\n\nb', ' a \n\n b\n\n\n'), ('', '\n\n'), ('', 'x'), ('x', ''),
+            ('a\nb', 'a'), ('a', 'a\nb'), ('\n\na', 'a\r\n'), ('a  b', 'a b'),
+        ]
+        for actual, expected in cases:
+            want = _legacy_compare(actual, expected)
+            assert compare_output(actual, expected).matched == want, (actual, expected)
+            # Expected output may come from a memory-mapped file
+            assert compare_output(actual, expected.encode()).matched == want, (actual, expected)
+
+    def test_checker_modes(self):
+        """Test token mode, float tolerance, case folding and exact mode"""
+        from src.comparator import CheckerMode, CheckerSpec, compare_output
+
+        tokens = CheckerSpec(CheckerMode.TOKENS)
+        assert compare_output('1 2\n3', '1\n2 3', tokens).matched
+        assert not compare_output('1 2 3', '1 2', tokens).matched
+
+        floats = CheckerSpec(CheckerMode.TOKENS, float_tolerance=1e-6)
+        assert compare_output('0.3333333 1e9', '0.33333331 1000000000.5', floats).matched
+        assert not compare_output('0.3334', '0.3333', floats).matched
+        assert not compare_output('abc', 'abd', floats).matched
+
+        # Tolerance and case folding also apply within lines in line mode
+        lines = CheckerSpec(float_tolerance=1e-3, case_insensitive=True)
+        assert compare_output('YES 2.0001\nno', 'yes 2\nNO', lines).matched
+        assert not compare_output('YES 2.0001 x\nno', 'yes 2\nNO', lines).matched
+
+        exact = CheckerSpec(CheckerMode.EXACT)
+        assert compare_output('a \n', b'a \n', exact).matched
+        assert not compare_output('a\n', 'a', exact).matched
+
+        # The first difference is reported and nothing after it is read
+        comparison = compare_output('1\n2\n9\n4', '1\n2\n3\n4')
+        assert comparison.message == "line 3: expected '3', got '9'"
+
+    def test_comparison_across_chunks(self):
+        """Test that chunk boundaries don't change the outcome"""
+        from src.comparator import CheckerMode, CheckerSpec, compare_output
+
+        with patch('src.comparator.CHUNK_SIZE', 4):
+            assert compare_output('\n\n 10 20\n30 \n\n\n', b'10 20\n30').matched
+            assert compare_output('10 20 30', b'10\n20\n30', CheckerSpec(CheckerMode.TOKENS)).matched
+            assert compare_output('abcdefgh\nij\n', b'abcdefgh\nij\n', CheckerSpec(CheckerMode.EXACT)).matched
+
+            comparison = compare_output('1\n2\n3\n4\n5\n\nx', b'1\n2\n3\n4\n5')
+            assert comparison.message == "line 7: expected end of output, got 'x'"
+            comparison = compare_output('1 2 3 4 5', b'1 2 3 4 5 6', CheckerSpec(CheckerMode.TOKENS))
+            assert comparison.message == "token 6: expected '6', got end of output"
+
+    def test_validator_uses_checker(self):
+        """Test that validate_test_cases accepts per-problem comparison rules"""
+        from src.comparator import CheckerMode, CheckerSpec
+        from src.test_validator import validate_output, validate_test_cases
+
+        assert validate_output('hello  \n', 'hello').is_valid
+        assert not validate_output('hello  \n', 'hello', strict=True).is_valid
+        results = validate_test_cases(['1.0001', 'Yes'], ['1', 'YES'],
+                                      checker=CheckerSpec.from_json({
+                                          'mode': 'tokens', 'floatTolerance': 1e-3,
+                                          'caseInsensitive': True}))
+        assert all(r.is_valid for r in results)
+        assert 'token 1' in validate_output('2', '1', checker=CheckerSpec(CheckerMode.TOKENS)).message
+        with pytest.raises(ValueError):
+            CheckerSpec.from_json({'mode': 'regex'})
+
     def test_test_case_result_structure(self):
         """Test that test case results have correct structure"""
         result = {
@@ -138,6 +868,338 @@ class TestWorker:
         assert 'language' in job
         assert 'test_cases' in job
 
+    def test_job_slot_released_after_failure(self):
+        """Test that a failing job frees its slot and its in-flight lease"""
+        import threading
+        import psycopg2
+        from src import worker
+
+        slots = threading.BoundedSemaphore(1)
+        slots.acquire()
+        job = {'id': 'job-1', 'job_key': 'bull:execution-queue:job-1',
+               'active_key': 'bull:execution-queue:active', 'data': {}}
+
+        with patch.object(worker, 'process_job', side_effect=psycopg2.OperationalError()):
+            worker.run_job_slot(MagicMock(), MagicMock(), MagicMock(), job, None, None, slots)
+
+        assert slots.acquire(blocking=False)
+        assert 'job-1' not in worker._inflight_jobs
+
+    @staticmethod
+    def fake_db_pool():
+        """A pool whose single connection records every executed statement"""
+        executed = []
+        conn = MagicMock(closed=0)
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.execute.side_effect = lambda sql, params=None: executed.append((sql, params))
+        pool = MagicMock()
+        pool.acquire.return_value = conn
+        return pool, conn, executed
+
+    def test_writer_coalesces_transitions_into_one_update(self):
+        """Test that queued transitions become one multi-row prepared UPDATE"""
+        from src.database import SubmissionWriter, SubmissionUpdate
+
+        pool, conn, executed = self.fake_db_pool()
+        writer = SubmissionWriter(pool, flush_interval_ms=10000)
+        writer.update(SubmissionUpdate('sub-1', 'processing'))
+        writer.update(SubmissionUpdate('sub-2', 'processing'))
+        # Waiting flushes at once; sub-1's two transitions collapse into one row
+        writer.update(SubmissionUpdate('sub-1', 'accepted', 12, 2048), wait=True)
+        writer.close()
+
+        assert executed[0][0].lstrip().startswith('PREPARE update_submissions')
+        updates = [params for sql, params in executed if sql.startswith('EXECUTE')]
+        assert len(updates) == 2
+        interim, final = updates
+        assert interim[:2] == (['sub-2'], ['processing'])
+        assert final[:4] == (['sub-1'], ['accepted'], [12], [2048])
+        # The coalesced row keeps its start time and gains a completion time
+        assert final[5][0] is not None and final[6][0] is not None
+        assert conn.commit.call_count == 3
+        assert pool.acquire.call_count == 1
+
+    def test_writer_async_commits_only_interim_updates(self):
+        """Test that synchronous_commit is relaxed only for non-final statuses"""
+        import psycopg2
+        from src.database import SubmissionWriter, SubmissionUpdate
+
+        pool, conn, executed = self.fake_db_pool()
+        writer = SubmissionWriter(pool, flush_interval_ms=0, async_interim_commit=True)
+        writer.update(SubmissionUpdate('sub-1', 'processing'))
+        writer.update(SubmissionUpdate('sub-2', 'wrong_answer'), wait=True)
+        writer.close()
+
+        statements = [sql for sql, _ in executed]
+        relaxed = statements.index('SET LOCAL synchronous_commit TO OFF')
+        assert executed[relaxed + 1][1][1] == ['processing']
+        assert statements.count('SET LOCAL synchronous_commit TO OFF') == 1
+
+        # A failed write reaches the caller waiting on it
+        pool, conn, executed = self.fake_db_pool()
+        conn.commit.side_effect = [None, psycopg2.DataError('bad row')]
+        writer = SubmissionWriter(pool, flush_interval_ms=0)
+        with pytest.raises(psycopg2.DataError):
+            writer.update(SubmissionUpdate('sub-3', 'accepted'), wait=True)
+        writer.close()
+
+    def test_writer_copies_results_with_final_update(self):
+        """Test that per-test results replace earlier ones through one COPY"""
+        from src.database import SubmissionWriter, SubmissionUpdate, TestResultRow
+
+        pool, conn, executed = self.fake_db_pool()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        copied = []
+        cursor.copy_expert.side_effect = lambda sql, data: copied.append((sql, data.read()))
+        rows = [
+            TestResultRow('tc-1', True, '1\t2\n', 5, 1024, None, 0),
+            TestResultRow('tc-2', False, 'a\\b', 7, 2048, 'Wrong Answer', 1),
+        ]
+        writer = SubmissionWriter(pool, flush_interval_ms=0)
+        writer.update(SubmissionUpdate('sub-1', 'wrong_answer', 7, 2048, results=rows), wait=True)
+        writer.close()
+
+        statements = [sql for sql, _ in executed]
+        delete = next(i for i, sql in enumerate(statements) if sql.startswith('DELETE'))
+        assert statements[delete - 1].startswith('EXECUTE')
+        assert executed[delete][1] == (['sub-1'],)
+        assert statements[delete + 1].lstrip().startswith('INSERT INTO submission_results')
+        assert len(copied) == 1
+        assert copied[0][1] == (
+            'sub-1\ttc-1\tt\t1\\t2\\n\t5\t1024\t\\N\t0\n'
+            'sub-1\ttc-2\tf\ta\\\\b\t7\t2048\tWrong Answer\t1\n'
+        )
+
+    @staticmethod
+    def fake_test_set_pool(versions):
+        """A pool serving problem 'p-1' at each successive version in `versions`"""
+        pool, conn, executed = TestWorker.fake_db_pool()
+        cursor = conn.cursor.return_value.__enter__.return_value
+        cursor.fetchall.side_effect = [
+            [{'test_set_version': v, 'checker': {}, 'id': f'tc-{v}', 'input': '1', 'expected_output': f'out-{v}'}]
+            for v in versions
+        ]
+        pool.connection.return_value.__enter__.return_value = conn
+        return pool, executed
+
+    def test_test_set_cache_reloads_newer_versions(self):
+        """Test that cached test sets are reused until a job needs a newer one"""
+        from src.problems import TestSetCache
+
+        pool, executed = self.fake_test_set_pool([3, 4])
+        cache = TestSetCache(pool)
+
+        def ids(version):
+            with cache.checkout('p-1', version) as test_set:
+                return [tc.id for tc in test_set.test_cases]
+
+        assert ids(3) == ['tc-3']
+        # Older and equal versions are served from memory
+        assert ids(2) == ['tc-3']
+        assert ids(3) == ['tc-3']
+        assert len(executed) == 1
+        assert executed[0][1] == ('p-1',)
+
+        # The problem's tests were edited after the first load
+        assert ids(4) == ['tc-4']
+        assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 2
+
+    def test_test_set_cache_bounded_by_size(self):
+        """Test that least recently used test sets are evicted past the cap"""
+        from src.executor import TestCase
+        from src.problems import TestSet, TestSetCache
+
+        cache = TestSetCache(MagicMock(), max_bytes=10)
+        for problem_id in ('p-1', 'p-2', 'p-3'):
+            cache._store(TestSet(problem_id, 1, [TestCase(problem_id, 'xx', 'y')], 4))
+        assert cache._lookup('p-1', 1) is None
+        assert cache._lookup('p-3', 1) is not None
+        assert cache.stats()['bytes'] == 8
+
+        # Missing problems surface as a job failure, not an empty test set
+        pool, conn, executed = self.fake_db_pool()
+        conn.cursor.return_value.__enter__.return_value.fetchall.side_effect = [[]]
+        pool.connection.return_value.__enter__.return_value = conn
+        with pytest.raises(LookupError):
+            with TestSetCache(pool).checkout('p-9', 1):
+                pass
+
+    def test_test_set_cache_pins_stored_data(self, tmp_path):
+        """Test that cached and checked-out test sets keep their files in the store"""
+        import os
+        from src.data_store import TestDataStore
+        from src.problems import TestSetCache
+
+        pool, executed = self.fake_test_set_pool([1, 2])
+        store = TestDataStore(str(tmp_path), max_bytes=0)
+        cache = TestSetCache(pool, store=store)
+
+        with cache.checkout('p-1', 1) as test_set:
+            first = test_set.test_cases[0]
+            assert (first.input, first.expected_output) == ('', '')
+            assert open(store.path(first.input_digest), 'rb').read() == b'1\n'
+            # A newer version replaces the cached set while this one still runs
+            with cache.checkout('p-1', 2):
+                pass
+            assert os.path.exists(store.path(first.expected_digest))
+        # Nothing pins version 1's output anymore, and the store has no room to
+        # spare; the unchanged input is shared with version 2
+        assert not os.path.exists(store.path(first.expected_digest))
+        assert os.path.exists(store.path(first.input_digest))
+        assert store.stats()['pinned'] == 2
+
+    def test_result_rows_cap_stored_output(self):
+        """Test that stored outputs are truncated on a character boundary"""
+        from src import worker
+        from src.executor import SubmissionResult, SubmissionStatus, TestCaseResult
+
+        tc_id = '00000000-0000-0000-0000-000000000001'
+        result = SubmissionResult(
+            submission_id='sub-1', status=SubmissionStatus.ACCEPTED,
+            test_results=[
+                TestCaseResult(test_case_id=tc_id, passed=True, output='é' * 10,
+                               expected_output='', execution_time_ms=5, memory_used_kb=1),
+                TestCaseResult(test_case_id='tc-legacy', passed=True, output='',
+                               expected_output='', execution_time_ms=5),
+            ],
+            total_execution_time_ms=5, max_memory_used_kb=1, stdout='', stderr='',
+            passed_count=2, total_count=2)
+        with patch.object(worker, 'STORED_OUTPUT_MAX_BYTES', 5):
+            rows = worker.result_rows(result)
+
+        # Results without a real test case id can't reference test_cases
+        assert [row.test_case_id for row in rows] == [tc_id]
+        assert rows[0].actual_output == 'éé'
+        assert rows[0].memory_usage == 1024
+
+    def test_batch_dequeue_parses_script_result(self):
+        """Test that the dequeue script's shard/id/data triples become jobs"""
+        from src import worker
+
+        redis_client = MagicMock()
+        script = MagicMock(return_value=[
+            1, 'job-1', '{"submissionId": "sub-1"}',
+            1, 'job-2', 'not json',
+        ])
+
+        with patch.object(worker, 'get_script', return_value=script):
+            jobs = worker.get_jobs_from_queue(redis_client, 2)
+
+        assert [job['id'] for job in jobs] == ['job-1']
+        assert jobs[0]['data']['submissionId'] == 'sub-1'
+        assert jobs[0]['job_key'] == 'bull:execution-queue:job-1'
+        assert jobs[0]['active_key'] == worker.QUEUE_ACTIVE_KEY
+        redis_client.zrem.assert_called_once_with(worker.QUEUE_ACTIVE_KEY, 'job-2')
+
+    def test_lease_renewal_only_touches_active_jobs(self):
+        """Test that renewal never resurrects completed or reaped jobs"""
+        from src import worker
+
+        redis_client = MagicMock()
+        worker.renew_leases(redis_client, ['job-1'])
+
+        args, kwargs = redis_client.zadd.call_args
+        assert args[0] == worker.QUEUE_ACTIVE_KEY
+        assert 'job-1' in args[1]
+        assert kwargs == {'xx': True}
+
+    def test_fail_job_removes_from_active_set(self):
+        """Test that failed jobs leave the active sorted set"""
+        from src import worker
+
+        redis_client = MagicMock()
+        worker.fail_job(redis_client, 'job-1', 'bull:execution-queue:job-1', 'boom')
+
+        redis_client.zrem.assert_called_once_with(worker.QUEUE_ACTIVE_KEY, 'job-1')
+
+    def test_blocking_wait_uses_marker(self):
+        """Test that idle workers block on the marker set"""
+        from src import worker
+
+        redis_client = MagicMock()
+        redis_client.bzpopmin.return_value = None
+
+        assert worker.wait_for_job_marker(redis_client, 2) is False
+        redis_client.bzpopmin.assert_called_once_with([worker.QUEUE_MARKER_KEY], timeout=2)
+
+    def test_fair_dequeue_interleaves_sessions(self):
+        """Test that a burst from one session doesn't starve the others"""
+        fakeredis = pytest.importorskip('fakeredis')
+        pytest.importorskip('lupa')
+        from src import worker
+
+        redis_client = fakeredis.FakeRedis(decode_responses=True)
+        queued = []
+
+        def enqueue(job_id, session, priority=1):
+            queued.append(job_id)
+            redis_client.zadd(worker.QUEUE_PRIORITIZED_KEY,
+                              {job_id: priority * 2 ** 32 + len(queued)})
+            redis_client.hset(f'bull:execution-queue:{job_id}', 'data',
+                              json.dumps({'submissionId': job_id, 'sessionId': session}))
+
+        for i in range(5):
+            enqueue(f'spam-{i}', 'spammer')
+        enqueue('alice-0', 'alice')
+        enqueue('bob-0', 'bob')
+
+        taken = [job['id'] for job in worker.get_jobs_from_queue(redis_client, 3)]
+        assert sorted(taken) == ['alice-0', 'bob-0', 'spam-0']
+
+        # Higher priority always goes first; a new session joins at the front
+        enqueue('carol-0', 'carol')
+        enqueue('urgent', 'spammer', priority=0)
+        taken = [job['id'] for job in worker.get_jobs_from_queue(redis_client, 3)]
+        assert taken == ['urgent', 'carol-0', 'spam-1']
+        assert redis_client.get('bull:execution-queue:fair:pending') == '3'
+
+    def test_sharded_dequeue_steals_after_own_shards(self):
+        """Test that owned shards are tried by weight before stolen ones"""
+        from src import worker
+        from src.queue_shards import QueueShard
+
+        redis_client = MagicMock()
+        script = MagicMock(return_value=[2, 'job-9', '{"submissionId": "sub-9"}'])
+        own = [QueueShard('jvm', 3.0)]
+        steal = [QueueShard('default')]
+
+        with patch.object(worker, 'get_script', return_value=script), \
+                patch.object(worker, 'OWN_SHARDS', own), \
+                patch.object(worker, 'STEAL_SHARDS', steal):
+            jobs = worker.get_jobs_from_queue(redis_client, 1)
+
+        keys = script.call_args.kwargs['keys']
+        assert keys[:3] == ['bull:execution-queue-jvm:prioritized',
+                            'bull:execution-queue-jvm:active',
+                            'bull:execution-queue-jvm:marker']
+        assert keys[3] == worker.QUEUE_PRIORITIZED_KEY
+        assert jobs[0]['job_key'] == 'bull:execution-queue:job-9'
+        assert jobs[0]['active_key'] == worker.QUEUE_ACTIVE_KEY
+
+    def test_shard_config_parsing_and_weights(self):
+        """Test shard routing config, weight validation and weighted ordering"""
+        import random
+        from src.queue_shards import (
+            QueueShard, dequeue_order, known_shards, parse_shard_map,
+            parse_shard_weights, shard_languages,
+        )
+
+        shard_map = parse_shard_map('java=jvm, cpp=native')
+        assert known_shards(shard_map) == ['default', 'jvm', 'native']
+        assert parse_shard_weights('', ['default', 'jvm']) == [
+            QueueShard('default'), QueueShard('jvm')]
+        own = parse_shard_weights('jvm:3,default', known_shards(shard_map))
+        assert own == [QueueShard('jvm', 3.0), QueueShard('default', 1.0)]
+        assert shard_languages(shard_map, own, ['python', 'java', 'cpp']) == ['python', 'java']
+        with pytest.raises(ValueError):
+            parse_shard_weights('gpu:1', known_shards(shard_map))
+
+        rng = random.Random(7)
+        firsts = [dequeue_order(own, [QueueShard('native')], rng)[0].name
+                  for _ in range(2000)]
+        assert 0.7 < firsts.count('jvm') / len(firsts) < 0.8
+        assert dequeue_order(own, [QueueShard('native')], rng)[-1].name == 'native'
+
     def test_status_transitions(self):
         """Test valid status transitions"""
         valid_statuses = [
@@ -77,7 +77,7 @@ export const publishSubmissionUpdate = async (update: SubmissionUpdate): Promise
 // Types
 export interface SubmissionUpdate {
   submissionId: string;
-  status: 'Queued' | 'Running' | 'Accepted' | 'Wrong Answer' | 'Time Limit Exceeded' | 'Runtime Error' | 'Compilation Error';
+  status: 'Queued' | 'Running' | 'Accepted' | 'Wrong Answer' | 'Time Limit Exceeded' | 'Output Limit Exceeded' | 'Runtime Error' | 'Compilation Error';
   executionTimeMs?: number;
   memoryUsedKb?: number;
   testResults?: Array<{
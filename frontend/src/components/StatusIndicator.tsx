@@ -5,6 +5,7 @@ import {
   Loader2,
   AlertTriangle,
   Code,
+  FileWarning,
 } from 'lucide-react';
 import { cn } from '@/lib/utils';
 import type { SubmissionStatus } from '@/types';
@@ -57,6 +58,12 @@ const statusConfig: Record<
     bgColor: 'bg-orange-500/10',
     label: 'Time Limit Exceeded',
   },
+  'Output Limit Exceeded': {
+    icon: FileWarning,
+    color: 'text-orange-500',
+    bgColor: 'bg-orange-500/10',
+    label: 'Output Limit Exceeded',
+  },
   'Runtime Error': {
     icon: AlertTriangle,
     color: 'text-red-500',
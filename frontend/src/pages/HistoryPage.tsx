@@ -98,6 +98,7 @@ const HistoryPage = () => {
             <SelectItem value="Accepted">Accepted</SelectItem>
             <SelectItem value="Wrong Answer">Wrong Answer</SelectItem>
             <SelectItem value="Time Limit Exceeded">TLE</SelectItem>
+            <SelectItem value="Output Limit Exceeded">OLE</SelectItem>
             <SelectItem value="Runtime Error">Runtime Error</SelectItem>
           </SelectContent>
         </Select>
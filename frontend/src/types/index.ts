@@ -10,6 +10,7 @@ export type SubmissionStatus =
   | 'Accepted'
   | 'Wrong Answer'
   | 'Time Limit Exceeded'
+  | 'Output Limit Exceeded'
   | 'Runtime Error'
   | 'Compilation Error';
 
@@ -196,6 +197,11 @@ export const STATUS_CONFIG: Record<SubmissionStatus, {
     bgColor: 'bg-orange-500/10',
     icon: 'Clock',
   },
+  'Output Limit Exceeded': {
+    color: 'text-orange-500',
+    bgColor: 'bg-orange-500/10',
+    icon: 'FileWarning',
+  },
   'Runtime Error': {
     color: 'text-red-500',
     bgColor: 'bg-red-500/10',
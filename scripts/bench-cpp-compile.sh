@@ -0,0 +1,72 @@
+#!/bin/bash
+
+# CodeArena - C++ Compile Benchmark
+# Times the runner's compile step with and without the precompiled
+# <bits/stdc++.h> shipped in the cpp runner image
+
+set -e
+
+TAG="${1:-codearena/cpp-runner:latest}"
+RUNS="${2:-5}"
+
+# Colors for output
+RED='\033[0;31m'
+GREEN='\033[0;32m'
+BLUE='\033[0;34m'
+NC='\033[0m' # No Color
+
+log_info() {
+    echo -e "${BLUE}[INFO]${NC} $1"
+}
+
+log_success() {
+    echo -e "${GREEN}[SUCCESS]${NC} $1"
+}
+
+log_error() {
+    echo -e "${RED}[ERROR]${NC} $1"
+}
+
+if ! docker image inspect "$TAG" > /dev/null 2>&1; then
+    log_error "Image $TAG not found. Build it with scripts/build-containers.sh first."
+    exit 1
+fi
+
+log_info "Benchmarking $RUNS compiles per mode in $TAG..."
+
+# A typical contest solution; only the first line matters for the PCH
+docker run --rm -i -e RUNS="$RUNS" "$TAG" sh -s <<'EOF'
+cat > /tmp/solution.cpp <<'CPP'
+#include <bits/stdc++.h>
+using namespace std;
+
+int main() {
+    ios::sync_with_stdio(false);
+    cin.tie(nullptr);
+    int n;
+    cin >> n;
+    vector<long long> values(n);
+    for (auto &v : values) cin >> v;
+    sort(values.begin(), values.end());
+    map<long long, int> counts;
+    for (auto v : values) counts[v]++;
+    cout << accumulate(values.begin(), values.end(), 0LL) << ' ' << counts.size() << '\n';
+}
+CPP
+
+bench() {
+    start=$(date +%s%N)
+    i=0
+    while [ "$i" -lt "$RUNS" ]; do
+        g++ -o /tmp/solution /tmp/solution.cpp -O2 "$@"
+        i=$((i + 1))
+    done
+    end=$(date +%s%N)
+    echo $(( (end - start) / RUNS / 1000000 ))
+}
+
+echo "without PCH: $(bench) ms/compile"
+echo "with PCH:    $(bench -I /opt/codearena/pch) ms/compile"
+EOF
+
+log_success "Benchmark complete"
@@ -126,6 +126,14 @@ test_container() {
         java)
             log_warning "Java test requires compilation, skipping quick test"
             docker run --rm "$tag" java --version 2>/dev/null | head -1
+            # -Xshare:on fails outright if an archive can't be mapped
+            for archive in java javac; do
+                if ! docker run --rm "$tag" java -Xshare:on \
+                        -XX:SharedArchiveFile="/opt/codearena/$archive.jsa" -version > /dev/null 2>&1; then
+                    log_error "CDS archive $archive.jsa is not usable"
+                    return 1
+                fi
+            done
             ;;
         cpp)
             log_warning "C++ test requires compilation, skipping quick test"
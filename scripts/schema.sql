@@ -30,6 +30,12 @@ CREATE TABLE problems (
     solution_template JSONB DEFAULT '{}'::jsonb,
     tags TEXT[] DEFAULT ARRAY[]::TEXT[],
     is_active BOOLEAN DEFAULT true,
+    -- Output comparison rules, e.g. {"mode": "tokens", "floatTolerance": 1e-6,
+    -- "caseInsensitive": true}; mode is exact, lines (default) or tokens, or
+    -- custom for a testlib-style checker program: {"mode": "custom",
+    -- "language": "cpp", "source": "...", "timeLimit": 5}
+    checker JSONB NOT NULL DEFAULT '{}'::jsonb,
+    test_set_version INTEGER NOT NULL DEFAULT 1, -- bumped whenever its test_cases or checker change
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -85,7 +91,7 @@ CREATE TABLE submissions (
     language VARCHAR(20) NOT NULL CHECK (language IN ('python', 'javascript', 'java', 'cpp')),
     status VARCHAR(50) NOT NULL DEFAULT 'queued' 
         CHECK (status IN ('queued', 'processing', 'accepted', 'wrong_answer', 
-                         'time_limit_exceeded', 'memory_limit_exceeded', 
+                         'time_limit_exceeded', 'memory_limit_exceeded', 'output_limit_exceeded',
                          'runtime_error', 'compilation_error', 'system_error')),
     execution_time INTEGER, -- milliseconds
     memory_usage INTEGER, -- bytes
@@ -138,6 +144,45 @@ CREATE TRIGGER update_problems_updated_at
     FOR EACH ROW 
     EXECUTE FUNCTION update_updated_at_column();
 
+-- ============================================
+-- Trigger for test_set_version
+-- ============================================
+-- Jobs carry the version their problem's tests had at submission time;
+-- workers reload their cached test set when it is older
+CREATE OR REPLACE FUNCTION bump_test_set_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'INSERT' THEN
+        UPDATE problems SET test_set_version = test_set_version + 1 WHERE id = OLD.problem_id;
+    END IF;
+    IF TG_OP <> 'DELETE' AND (TG_OP = 'INSERT' OR NEW.problem_id <> OLD.problem_id) THEN
+        UPDATE problems SET test_set_version = test_set_version + 1 WHERE id = NEW.problem_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER bump_problems_test_set_version
+    AFTER INSERT OR UPDATE OR DELETE ON test_cases
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_test_set_version();
+
+-- Workers cache the checker with the test set, so a new one needs a new version
+CREATE OR REPLACE FUNCTION bump_test_set_version_on_checker()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.checker IS DISTINCT FROM OLD.checker THEN
+        NEW.test_set_version = OLD.test_set_version + 1;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+CREATE TRIGGER bump_problems_checker_version
+    BEFORE UPDATE OF checker ON problems
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_test_set_version_on_checker();
+
 -- ============================================
 -- Helper Functions
 -- ============================================